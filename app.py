@@ -1,41 +1,111 @@
 from datetime import datetime,date
-import matplotlib.dates as mdates
+import time
 
 import streamlit as st
 import streamlit.components.v1 as components
-from supabase import create_client, Client
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
 import pandas as pd
 import numpy as np
 import html
 
-from income_calc import income_c
+from income_calc import income_c, TAX_REGISTRY
+from contribution_optimizer import solve_contributions
+from budget_engine import month_budget_vs_actual, bucket_budgets, category_breakdowns
 from helpers import *
 from budget_map import *
 
-pie_fig = None
-proj_fig = None
-fig_s = None
+rerun_started = time.perf_counter()
+income_c = timed("income_c")(income_c)
 
 # Connect to supabase
 supabase = init_connection()
-restore_session(supabase)
-
-u = supabase.auth.get_user()
-user_id = u.user.id if (u and u.user) else None
+user_id, user_email = current_user()
 
 display_name = None
 saved_data = None
+data = {}
+
+month_start = date.today().replace(day=1)
 
 if user_id:
-    prof = fetch_budget_profile(user_id)   # <-- cached
+    # all reads for this rerun, fetched concurrently (each one is still cached)
+    data = load_user_data(
+        user_id,
+        month_start.isoformat(),
+        date.today().isoformat(),
+    )
+    prof = data["profile"]
     saved_data = prof.get("data")
     display_name = prof.get("display_name")
     st.session_state["Display name"] = display_name
 else:
     st.session_state.pop("Display name", None)
 
+DEFAULTS = {
+    "use_second_income": False,
+    "tax_year": 2026,
+    "filing_status": "single",
+    "tax_state": "MI",
+    "annual_salary": 50000.0,
+    "pretax_401k_annual": 10.0,
+    "match_rate": 0.0,
+    "hsa_monthly_in": 0.0,
+    "healthcare_monthly_premium": 0.0,
+    "other_income": 0.0,
+    "annual_salary_2": 50000.0,
+    "pretax_401k_annual_2": 10.0,
+    "match_rate_2": 0.0,
+    "hsa_monthly_in_2": 0.0,
+    "healthcare_monthly_premium_2": 0.0,
+    "other_income_2": 0.0,
+    "rent_in": 1000.0,
+    "utilities_in": 100.0,
+    "insurance_in": 0.0,
+    "trans_travel_in": 100.0,
+    "food_in": 100.0,
+    "debt_in": 0.0,
+    "clothes_in": 100.0,
+    "phone_in": 0.0,
+    "subs_in": 0.0,
+    "roth_in": 0.0,
+    "stocks_in": 0.0,
+    "post_other_in": 0.0,
+    "emergency_in": 0.0,
+    "vacations_in": 0.0,
+    "gifts_in": 0.0,
+    "save_other_in": 0.0,
+    "current_cash": 0.0,
+    "current_investments": 0.0,
+}
+
+# The other widgets whose values outlive a tab switch (not saved to the profile)
+WIDGET_DEFAULTS = {
+	"solver_use_nw": True,
+	"solver_target": 1_000_000.0,
+	"solver_years": 20,
+	"solver_use_gf": False,
+	"solver_floor": 200.0,
+	"solver_return": 0.07,
+	"projection_years": 10,
+	"mc_mean": 0.07,
+	"mc_vol": 0.15,
+	"mc_paths": 10_000,
+	"mc_seed": 0,
+	"exp_from": date.today().replace(day=1),
+	"exp_to": date.today(),
+}
+
+for k, v in {**DEFAULTS, **WIDGET_DEFAULTS}.items():
+	st.session_state.setdefault(k, v)
+
+# Only the open tab runs (see st.tabs below), and Streamlit drops the state of
+# widgets that weren't drawn in a run. Writing these back each rerun keeps the
+# inputs of hidden tabs; that's also why the widgets take their defaults from
+# session state instead of value=.
+KEEP_WIDGET_STATE = (*DEFAULTS, *WIDGET_DEFAULTS, "projection_mode", "mc_source", "exp_page_size")
+for k in KEEP_WIDGET_STATE:
+	if k in st.session_state:
+		st.session_state[k] = st.session_state[k]
+
 
 header_slot = st.empty()
 
@@ -96,16 +166,12 @@ with st.sidebar:
 				user = getattr(res, "user", None)
 				if session and user:
 					set_session(session)
-					restore_session(supabase)
 					st.success("Sucess!")
 					st.rerun()
 	else:
 		# Show current user + logout
-		restore_session(supabase)
-		u = supabase.auth.get_user()
-		if u and u.user:
+		if user_id:
 
-			user_id = u.user.id
 			# res = (
 			#     supabase.table("budget_profile")
 			#     .select("display_name")
@@ -117,18 +183,16 @@ with st.sidebar:
 			# st.session_state["Display name"] = display_name
 
 			st.divider()
-			st.write(f"Signed in as: **{u.user.email}**")
+			st.write(f"Signed in as: **{user_email}**")
 			st.write("Current display name:", display_name)
 
 			if st.button("Logout", width='stretch'):
-				try:
-					supabase.auth.sign_out()
-				except Exception:
-					pass
+				get_write_queue(user_id).flush(timeout=5)
+				sign_out(user_id)
 				clear_session()
 				st.session_state.pop("Display name", None)
-				clear_profile_cache()    # NEW
-				clear_expense_cache()    # NEW (optional)
+				clear_profile_cache(user_id)
+				clear_expense_cache(user_id)
 				st.rerun()
 
 			with st.form("display_name_form"):
@@ -136,436 +200,575 @@ with st.sidebar:
 			    submitted = st.form_submit_button("Change display name")
 
 			if submitted:
-				supabase.table("budget_profile").update({"display_name": new_name}).eq("id", user_id).execute()
-				clear_profile_cache()               # <-- NEW
+				save_display_name(user_id, new_name)
+				clear_profile_cache(user_id)
 				st.session_state["Display name"] = new_name
 				st.success("New display name saved.")
 				st.rerun()
 
-			res_data = (
-			    supabase.table("budget_profile")
-			    .select("data")
-			    .eq("id", user_id)
-			    .single()
-			    .execute()
-			)
-
-			saved_data = res_data.data.get("data") if res_data.data else None
-
+			# saved_data comes from the same cached profile read as the header
 			if saved_data is not None and st.session_state.get("profile_not_loaded") is None:
 				st.session_state["profile_not_loaded"] = False	
 				for key, value in saved_data.items():
 					st.session_state[key] = value
 				st.success("Saved Profile Data Loaded")
 
-# -----------------------
-# Streamlit UI
-# -----------------------
-tab1,tab2,tab3 = st.tabs(["Set up Budget","Dashboard", "Expense Tracker"])
-
-with tab1:
-	st.title("Setup Page")
-
-	st.header("Income")
-	annual_salary = st.number_input("Pretax Annual salary", min_value=0.0, step=1000.0, key="annual_salary")
-	pretax_401k_annual = st.number_input("401k annual contribution", min_value=0.0, step=500.0,key="pretax_401k_annual")
-	match_rate = st.number_input("Employer match rate (decimal)", min_value=0.0, max_value=1.0, step=0.01,key="match_rate")
-	hsa_monthly_in = st.number_input("HSA monthly contribution", min_value=0.0,key="hsa_monthly_in")
-	healthcare_monthly_premium = st.number_input("Healthcare monthly premium", min_value=0.0, step=50.0,key="healthcare_monthly_premium")
-	other_income = st.number_input("Other monthly income",min_value=0.0,step=100.0,key="other_income")
-
-	st.divider()
-	st.checkbox("Include 2nd income", key="use_second_income")
-
-	if st.session_state["use_second_income"]:
-		st.subheader("Income (Person 2)")
-		annual_salary_2 = st.number_input("Pretax Annual salary (2)", min_value=0.0, step=1000.0, key="annual_salary_2")
-		pretax_401k_annual_2 = st.number_input("401k annual contribution (2)", min_value=0.0, step=500.0,key="pretax_401k_annual_2")
-		match_rate_2 = st.number_input("Employer match rate (2) (decimal)", min_value=0.0, max_value=1.0, step=0.01,key="match_rate_2")
-		hsa_monthly_in_2 = st.number_input("HSA monthly contribution (2)", min_value=0.0,key="hsa_monthly_in_2")
-		healthcare_monthly_premium_2 = st.number_input("Healthcare monthly (2) premium", min_value=0.0, step=50.0,key="healthcare_monthly_premium_2")
-		other_income_2 = st.number_input("Other monthly income (2)",min_value=0.0,step=100.0,key="other_income_2")
-
-	st.divider()
-	st.header("Fixed Costs (monthly)")
-	rent_in = st.number_input("Rent", min_value=0.0, step=50.0,key="rent_in")
-	utilities_in = st.number_input("Utilities", min_value=0.0, step=25.0,key="utilities_in")
-	insurance_in = st.number_input("Insurance", min_value=0.0, step=25.0,key="insurance_in")
-	trans_travel_in = st.number_input("Transportation/Travel", min_value=0.0, step=25.0,key="trans_travel_in")
-	food_in = st.number_input("Food/Groceries", min_value=0.0, step=25.0,key="food_in")
-	debt_in = st.number_input("Debt", min_value=0.0, step=10.0,key="debt_in")
-	clothes_in = st.number_input("Clothes", min_value=0.0, step=25.0,key="clothes_in")
-	phone_in = st.number_input("Phone", min_value=0.0, step=10.0,key="phone_in")
-	subs_in = st.number_input("Subscriptions", min_value=0.0, step=25.0,key="subs_in")
-
-	st.divider()
-	st.header("Post-tax Investments (monthly)")
-	roth_in = st.number_input("Roth (monthly)", min_value=0.0, step=50.0,key="roth_in")
-	stocks_in = st.number_input("Stocks (monthly)", min_value=0.0, step=50.0,key="stocks_in")
-	post_other_in = st.number_input("Other post-tax (monthly)", min_value=0.0, step=25.0,key="post_other_in")
-
-	st.divider()
-	st.header("Savings (monthly, 0% return)")
-	emergency_in = st.number_input("Emergency fund", min_value=0.0, step=50.0,key="emergency_in")
-	vacations_in = st.number_input("Vacations", min_value=0.0, step=50.0,key="vacations_in")
-	gifts_in = st.number_input("Gifts", min_value=0.0, step=25.0,key="gifts_in")
-	save_other_in = st.number_input("Other savings", min_value=0.0, step=25.0,key="save_other_in")
-
-	st.divider()
-	st.header("Net Worth")
-	current_cash = st.number_input("Current cash", min_value=0.0, step=1000.0,key="current_cash")
-	current_investments = st.number_input("Current investments", min_value=0.0, step=5000.0,key="current_investments")
-
-with tab2:
-	st.title("Monthly Budget Dashboard")
-
-	DEFAULTS = {
-		"use_second_income": False,
-	    "annual_salary": 50000.0,
-	    "pretax_401k_annual": 10.0,
-	    "match_rate": 0.0,
-	    "hsa_monthly_in": 0.0,
-	    "healthcare_monthly_premium": 0.0,
-	    "other_income": 0.0,
-	    "annual_salary_2": 50000.0,
-	    "pretax_401k_annual_2": 10.0,
-	    "match_rate_2": 0.0,
-	    "hsa_monthly_in_2": 0.0,
-	    "healthcare_monthly_premium_2": 0.0,
-	    "other_income_2": 0.0,
-	    "rent_in": 1000.0,
-	    "utilities_in": 100.0,
-	    "insurance_in": 0.0,
-	    "trans_travel_in": 100.0,
-	    "food_in": 100.0,
-	    "debt_in": 0.0,
-	    "clothes_in": 100.0,
-	    "phone_in": 0.0,
-	    "subs_in": 0.0,
-	    "roth_in": 0.0,
-	    "stocks_in": 0.0,
-	    "post_other_in": 0.0,
-	    "emergency_in": 0.0,
-	    "vacations_in": 0.0,
-	    "gifts_in": 0.0,
-	    "save_other_in": 0.0,
-	    "current_cash": 0.0,
-	    "current_investments": 0.0,
-	}
-
-	for k, v in DEFAULTS.items():
-	    st.session_state.setdefault(k, v)
-
-	if not user_id:
-		st.info("Log in to load saved settings")
-	else:
-		with st.sidebar:
-			if saved_data is not None:
-				if st.button("Load Saved Profile Settings",width='stretch'):
-					for key, value in saved_data.items():
-						st.session_state[key] = value
-					st.session_state["profile_not_loaded"] = False
-					st.sidebar.success("Saved settings loaded.")
-					st.rerun()
+if user_id:
+	with st.sidebar:
+		if saved_data is not None:
+			if st.button("Load Saved Profile Settings",width='stretch'):
+				for key, value in saved_data.items():
+					st.session_state[key] = value
+				st.session_state["profile_not_loaded"] = False
+				st.sidebar.success("Saved settings loaded.")
+				st.rerun()
 
-			if st.button("Save profile settings", width='stretch'):
-				profile_payload = {k: st.session_state.get(k) for k in DEFAULTS.keys()}
-				out = save_profile_data(supabase, user_id, profile_payload)
-				st.sidebar.success("Saved your profile!")
-
-	# Compute Noah income + pre-tax items
-	noahs_income, pretax_401k_monthly, hsa_monthly = income_c(
-		annual_salary,
-		pretax_401k_annual,
-		match_rate,
-		hsa_monthly_in,
-		healthcare_monthly_premium
-	)
+		if st.button("Save profile settings", width='stretch'):
+			profile_payload = {k: st.session_state.get(k) for k in DEFAULTS.keys()}
+			out = save_profile_data(user_id, profile_payload)
+			clear_profile_cache(user_id)
+			st.sidebar.success("Saved your profile!")
 
-	monthly_income = float(other_income + noahs_income)
-	monthly_401k = pretax_401k_monthly
-	monthly_hsa = hsa_monthly
-
-	if st.session_state["use_second_income"]:
-		income2, pretax_401K_monthly2, hsa_monthly2 = income_c(
-			st.session_state["annual_salary_2"],
-			st.session_state["pretax_401k_annual_2"],
-			st.session_state["match_rate_2"],
-			st.session_state["hsa_monthly_in_2"],
-			st.session_state["healthcare_monthly_premium_2"]
-		)
 
-		monthly_income += float(income2 + st.session_state["other_income_2"])
-		monthly_401k += float(pretax_401K_monthly2)
-		monthly_hsa += float(hsa_monthly2)
-
-
-	# Budget pieces
-	fixed, fixed_block = fixed_costs(
-		rent=rent_in,
-		utilities=utilities_in,
-		insurance=insurance_in,
-		trans_travel=trans_travel_in,
-		debt=debt_in,
-		food=food_in,
-		clothes=clothes_in,
-		phone=phone_in,
-		subs=subs_in
+# -----------------------
+# Budget numbers
+# -----------------------
+# Read from session state rather than the Setup widgets, so every tab has them
+# whether or not Setup ran this time. All cheap arithmetic; the charts are cached.
+tax_rules = tax_rules_for(st.session_state["tax_year"], st.session_state["filing_status"], st.session_state["tax_state"])
+annual_salary = st.session_state["annual_salary"]
+pretax_401k_annual = st.session_state["pretax_401k_annual"]
+match_rate = st.session_state["match_rate"]
+hsa_monthly_in = st.session_state["hsa_monthly_in"]
+healthcare_monthly_premium = st.session_state["healthcare_monthly_premium"]
+other_income = st.session_state["other_income"]
+rent_in = st.session_state["rent_in"]
+utilities_in = st.session_state["utilities_in"]
+insurance_in = st.session_state["insurance_in"]
+trans_travel_in = st.session_state["trans_travel_in"]
+food_in = st.session_state["food_in"]
+debt_in = st.session_state["debt_in"]
+clothes_in = st.session_state["clothes_in"]
+phone_in = st.session_state["phone_in"]
+subs_in = st.session_state["subs_in"]
+roth_in = st.session_state["roth_in"]
+stocks_in = st.session_state["stocks_in"]
+post_other_in = st.session_state["post_other_in"]
+emergency_in = st.session_state["emergency_in"]
+vacations_in = st.session_state["vacations_in"]
+gifts_in = st.session_state["gifts_in"]
+save_other_in = st.session_state["save_other_in"]
+current_cash = st.session_state["current_cash"]
+current_investments = st.session_state["current_investments"]
+
+# Compute Noah income + pre-tax items
+noahs_income, pretax_401k_monthly, hsa_monthly = income_c(
+	annual_salary,
+	pretax_401k_annual,
+	match_rate,
+	hsa_monthly_in,
+	healthcare_monthly_premium,
+	rules=tax_rules
+)
+
+monthly_income = float(other_income + noahs_income)
+monthly_401k = pretax_401k_monthly
+monthly_hsa = hsa_monthly
+
+if st.session_state["use_second_income"]:
+	income2, pretax_401K_monthly2, hsa_monthly2 = income_c(
+		st.session_state["annual_salary_2"],
+		st.session_state["pretax_401k_annual_2"],
+		st.session_state["match_rate_2"],
+		st.session_state["hsa_monthly_in_2"],
+		st.session_state["healthcare_monthly_premium_2"],
+		rules=tax_rules
 	)
 
-	post_tax, post_block = post_tax_investments(roth=roth_in, stocks=stocks_in, other=post_other_in)
-	save, savings_block = savings(emergency=emergency_in, vacations=vacations_in, gifts=gifts_in, other=save_other_in)
-
-	guilt_free = monthly_income - fixed - post_tax - save
+	monthly_income += float(income2 + st.session_state["other_income_2"])
+	monthly_401k += float(pretax_401K_monthly2)
+	monthly_hsa += float(hsa_monthly2)
 
-	# Net worth
-	current_net_worth = float(current_cash + current_investments)
 
-	# Projection (invest earns return, savings earns 0%)
-	monthly_invest = float(monthly_401k + monthly_hsa + post_tax)
-	monthly_savings = float(save)
-	annual_contrib_total = (monthly_invest + monthly_savings) * 12
+# Budget pieces
+fixed, fixed_block = fixed_costs(
+	rent=rent_in,
+	utilities=utilities_in,
+	insurance=insurance_in,
+	trans_travel=trans_travel_in,
+	debt=debt_in,
+	food=food_in,
+	clothes=clothes_in,
+	phone=phone_in,
+	subs=subs_in
+)
 
-	# Charts
-	if monthly_income != 0:
-		pie_fig = make_pie_fig(monthly_income, fixed, post_tax, save, guilt_free, monthly_401k, monthly_hsa)
-	
-	timestamp = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-
-	# Layout
-	col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
-	col1.metric("Current Net Worth", f"${current_net_worth:,.0f}")
-	col2.metric("Monthly Added (Invest + Savings)", f"${(monthly_invest + monthly_savings):,.0f}/mo")
-	col3.metric("Annual Added (Invest + Savings)", f"${annual_contrib_total:,.0f}/yr")
-	col4.metric("Weekly Guild Free Spending", f"${guilt_free / 4:,.2f}/wk")
-
-	st.subheader("Budget Report")
-	# Build the nicer HTML report (use your dynamic header)
-	report_html = make_budget_html(
-	    timestamp=timestamp,
-	    income=monthly_income,
-	    pretax_401k=monthly_401k,
-	    pretax_hsa=monthly_hsa,
-	    fixed=fixed,
-	    post_tax=post_tax,
-	    save=save,
-	    guilt_free=guilt_free,
-	    fixed_block_text=fixed_block,
-	    post_block_text=post_block,
-	    savings_block_text=savings_block
-	)
+post_tax, post_block = post_tax_investments(roth=roth_in, stocks=stocks_in, other=post_other_in)
+save, savings_block = savings(emergency=emergency_in, vacations=vacations_in, gifts=gifts_in, other=save_other_in)
 
-	components.html(report_html, height=1150, scrolling=True)
+guilt_free = monthly_income - fixed - post_tax - save
 
-	st.subheader("Charts")
-	if monthly_income != 0:
-		st.pyplot(pie_fig, clear_figure=True)
+# Net worth
+current_net_worth = float(current_cash + current_investments)
 
+# Projection (invest earns return, savings earns 0%)
+monthly_invest = float(monthly_401k + monthly_hsa + post_tax)
+monthly_savings = float(save)
+annual_contrib_total = (monthly_invest + monthly_savings) * 12
 
-	projection_years = st.slider("Projection Years", min_value=1, max_value=40, value=10, step=1)
-	returns = (0.05, 0.07, 0.09)
-	t_years, contrib_invest, savings_series, fv_map = projection_series_with_savings(
-		pv=current_net_worth,
-		monthly_invest=monthly_invest,
-		monthly_savings=monthly_savings,
-		years=projection_years,
-		annual_returns=returns
-	)
-	proj_fig = make_projection_fig(t_years, contrib_invest, savings_series, fv_map)
-	st.pyplot(proj_fig, clear_figure=True)
+# -----------------------
+# Streamlit UI
+# -----------------------
+# Lazy tabs: switching tabs reruns the app and only the open tab's body runs,
+# so typing in the Expense Tracker doesn't redraw the Dashboard and vice versa.
+tab1,tab2,tab3 = st.tabs(["Set up Budget","Dashboard", "Expense Tracker"], key="active_tab", on_change="rerun")
 
+with tab1:
+	if tab1.open:
+		st.title("Setup Page")
+
+		st.header("Taxes")
+		tx1, tx2, tx3 = st.columns(3)
+		tax_year = tx1.selectbox("Tax year", TAX_REGISTRY.years, key="tax_year")
+		filing_status = tx2.selectbox("Filing status", TAX_REGISTRY.filing_statuses(tax_year), format_func=FILING_STATUS_LABELS.get, key="filing_status")
+		state_codes = TAX_REGISTRY.states(tax_year)
+		tax_state = tx3.selectbox("State", state_codes, format_func=lambda c: f"{TAX_REGISTRY.state_names[c]} ({c})", key="tax_state")
+		tax_rules = tax_rules_for(tax_year, filing_status, tax_state)
+
+		st.divider()
+		st.header("Income")
+		annual_salary = st.number_input("Pretax Annual salary", min_value=0.0, step=1000.0, key="annual_salary")
+		pretax_401k_annual = st.number_input("401k annual contribution", min_value=0.0, step=500.0,key="pretax_401k_annual")
+		match_rate = st.number_input("Employer match rate (decimal)", min_value=0.0, max_value=1.0, step=0.01,key="match_rate")
+		hsa_monthly_in = st.number_input("HSA monthly contribution", min_value=0.0,key="hsa_monthly_in")
+		healthcare_monthly_premium = st.number_input("Healthcare monthly premium", min_value=0.0, step=50.0,key="healthcare_monthly_premium")
+		other_income = st.number_input("Other monthly income",min_value=0.0,step=100.0,key="other_income")
+
+		st.divider()
+		st.checkbox("Include 2nd income", key="use_second_income")
+
+		if st.session_state["use_second_income"]:
+			st.subheader("Income (Person 2)")
+			annual_salary_2 = st.number_input("Pretax Annual salary (2)", min_value=0.0, step=1000.0, key="annual_salary_2")
+			pretax_401k_annual_2 = st.number_input("401k annual contribution (2)", min_value=0.0, step=500.0,key="pretax_401k_annual_2")
+			match_rate_2 = st.number_input("Employer match rate (2) (decimal)", min_value=0.0, max_value=1.0, step=0.01,key="match_rate_2")
+			hsa_monthly_in_2 = st.number_input("HSA monthly contribution (2)", min_value=0.0,key="hsa_monthly_in_2")
+			healthcare_monthly_premium_2 = st.number_input("Healthcare monthly (2) premium", min_value=0.0, step=50.0,key="healthcare_monthly_premium_2")
+			other_income_2 = st.number_input("Other monthly income (2)",min_value=0.0,step=100.0,key="other_income_2")
+
+		st.divider()
+		st.header("Fixed Costs (monthly)")
+		rent_in = st.number_input("Rent", min_value=0.0, step=50.0,key="rent_in")
+		utilities_in = st.number_input("Utilities", min_value=0.0, step=25.0,key="utilities_in")
+		insurance_in = st.number_input("Insurance", min_value=0.0, step=25.0,key="insurance_in")
+		trans_travel_in = st.number_input("Transportation/Travel", min_value=0.0, step=25.0,key="trans_travel_in")
+		food_in = st.number_input("Food/Groceries", min_value=0.0, step=25.0,key="food_in")
+		debt_in = st.number_input("Debt", min_value=0.0, step=10.0,key="debt_in")
+		clothes_in = st.number_input("Clothes", min_value=0.0, step=25.0,key="clothes_in")
+		phone_in = st.number_input("Phone", min_value=0.0, step=10.0,key="phone_in")
+		subs_in = st.number_input("Subscriptions", min_value=0.0, step=25.0,key="subs_in")
+
+		st.divider()
+		st.header("Post-tax Investments (monthly)")
+		roth_in = st.number_input("Roth (monthly)", min_value=0.0, step=50.0,key="roth_in")
+		stocks_in = st.number_input("Stocks (monthly)", min_value=0.0, step=50.0,key="stocks_in")
+		post_other_in = st.number_input("Other post-tax (monthly)", min_value=0.0, step=25.0,key="post_other_in")
+
+		st.divider()
+		st.header("Savings (monthly, 0% return)")
+		emergency_in = st.number_input("Emergency fund", min_value=0.0, step=50.0,key="emergency_in")
+		vacations_in = st.number_input("Vacations", min_value=0.0, step=50.0,key="vacations_in")
+		gifts_in = st.number_input("Gifts", min_value=0.0, step=25.0,key="gifts_in")
+		save_other_in = st.number_input("Other savings", min_value=0.0, step=25.0,key="save_other_in")
+
+		st.divider()
+		st.header("Net Worth")
+		current_cash = st.number_input("Current cash", min_value=0.0, step=1000.0,key="current_cash")
+		current_investments = st.number_input("Current investments", min_value=0.0, step=5000.0,key="current_investments")
+
+		st.divider()
+		st.header("Contribution Solver")
+		with st.expander("Solve my 401k / Roth / stocks split from targets"):
+			st.caption("Fills the 401k first (cheapest per dollar invested after tax), then Roth up to the IRA limit, then stocks. Other inputs stay as entered.")
+			sv1, sv2, sv3, sv4 = st.columns(4)
+			use_nw_target = sv1.checkbox("Target net worth", key="solver_use_nw")
+			solver_target = sv1.number_input("Net worth", min_value=0.0, step=50_000.0, key="solver_target", disabled=not use_nw_target)
+			solver_years = sv2.number_input("By year", min_value=1, max_value=40, step=1, key="solver_years")
+			use_gf_floor = sv3.checkbox("Minimum guilt-free", key="solver_use_gf")
+			solver_floor = sv3.number_input("Weekly", min_value=0.0, step=25.0, key="solver_floor", disabled=not use_gf_floor)
+			solver_return = sv4.number_input("Annual return", step=0.005, format="%.3f", key="solver_return")
+
+			if use_nw_target or use_gf_floor:
+				solver_fixed, _ = fixed_costs(rent_in, utilities_in, insurance_in, trans_travel_in, debt_in, food_in, clothes_in, phone_in, subs_in)
+				solver_save, _ = savings(emergency_in, vacations_in, gifts_in, save_other_in)
+				solver_other_income = other_income
+				solver_other_invest = post_other_in
+				if st.session_state["use_second_income"]:
+					income2, k401_2, hsa2 = income_c(
+						st.session_state["annual_salary_2"],
+						st.session_state["pretax_401k_annual_2"],
+						st.session_state["match_rate_2"],
+						st.session_state["hsa_monthly_in_2"],
+						st.session_state["healthcare_monthly_premium_2"],
+						rules=tax_rules
+					)
+					solver_other_income += income2 + st.session_state["other_income_2"]
+					solver_other_invest += k401_2 + hsa2
+
+				solved = solve_contributions(
+					annual_salary, match_rate, hsa_monthly_in, healthcare_monthly_premium,
+					other_monthly_income=solver_other_income,
+					outflows_monthly=solver_fixed + solver_save + post_other_in,
+					current_net_worth=current_cash + current_investments,
+					years=int(solver_years),
+					target_net_worth=solver_target if use_nw_target else None,
+					min_weekly_guilt_free=solver_floor if use_gf_floor else None,
+					annual_return=solver_return,
+					monthly_savings=solver_save,
+					other_invest_monthly=solver_other_invest,
+					rules=tax_rules,
+				)
+
+				r1, r2, r3, r4, r5 = st.columns(5)
+				r1.metric("401k / yr", f"${solved.pretax_401k_annual:,.0f}")
+				r2.metric("Roth / mo", f"${solved.roth_monthly:,.0f}")
+				r3.metric("Stocks / mo", f"${solved.stocks_monthly:,.0f}")
+				r4.metric("Guilt free / wk", f"${solved.weekly_guilt_free:,.2f}")
+				r5.metric(f"Net worth in {int(solver_years)} yrs", f"${solved.net_worth:,.0f}")
+
+				if not solved.feasible:
+					if solved.limited_by == "income":
+						st.warning("These targets aren't reachable with your current income and costs.")
+					else:
+						st.warning("Can't reach the net worth target without going under your guilt-free minimum; this is the closest plan.")
+
+				def apply_solution(plan=solved):
+					st.session_state["pretax_401k_annual"] = plan.pretax_401k_annual
+					st.session_state["roth_in"] = plan.roth_monthly
+					st.session_state["stocks_in"] = plan.stocks_monthly
+
+				st.button("Apply to my budget", on_click=apply_solution, key="solver_apply")
 
-	make_html = st.checkbox("Generate HTML report preview", value=False)
+with tab2:
+	if tab2.open:
+		st.title("Monthly Budget Dashboard")
 
-	if make_html:
-	    # Build chart images for HTML export
-		pie_b64 = fig_to_base64_png(pie_fig)
-		proj_b64 = fig_to_base64_png(proj_fig)
+		if not user_id:
+			st.info("Log in to load saved settings")
 
-		st.download_button(
-			"Download dashboard (.html)",
-			data=report_html.encode("utf-8"),
-			file_name="budget_dashboard.html",
-			mime="text/html"
+		# Charts
+		pie_chart = None
+		if monthly_income != 0:
+			pie_chart = pie_png(monthly_income, fixed, post_tax, save, guilt_free, monthly_401k, monthly_hsa)  # cached
+	
+		timestamp = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+
+		# Layout
+		col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+		col1.metric("Current Net Worth", f"${current_net_worth:,.0f}")
+		col2.metric("Monthly Added (Invest + Savings)", f"${(monthly_invest + monthly_savings):,.0f}/mo")
+		col3.metric("Annual Added (Invest + Savings)", f"${annual_contrib_total:,.0f}/yr")
+		col4.metric("Weekly Guild Free Spending", f"${guilt_free / 4:,.2f}/wk")
+
+		st.subheader("Budget Report")
+		# Build the nicer HTML report (use your dynamic header)
+		report_args = dict(
+		    timestamp=timestamp,
+		    income=monthly_income,
+		    pretax_401k=monthly_401k,
+		    pretax_hsa=monthly_hsa,
+		    fixed=fixed,
+		    post_tax=post_tax,
+		    save=save,
+		    guilt_free=guilt_free,
+		    fixed_block_text=fixed_block,
+		    post_block_text=post_block,
+		    savings_block_text=savings_block
 		)
-	else:
-		# no base64 work
-		pass
+		report_html = make_budget_html(**report_args)
+
+		components.html(report_html, height=1150, scrolling=True)
+
+		st.subheader("Charts")
+		if monthly_income != 0:
+			show_png(pie_chart)
+
+
+		@st.fragment
+		def projection_section():
+			# the projection controls rerun only this block, not the report and charts around it
+			projection_years = st.slider("Projection Years", min_value=1, max_value=40, step=1, key="projection_years")
+			projection_mode = st.radio("Projection mode", ["Fixed returns (5%, 7%, 9%)", "Monte Carlo"], horizontal=True, key="projection_mode")
+
+			if projection_mode == "Monte Carlo":
+				mc1, mc2, mc3, mc4, mc5 = st.columns(5)
+				mc_source = mc1.selectbox("Returns", ["Mean / volatility", "Historical S&P 500 (bootstrap)"], key="mc_source")
+				use_historical = mc_source != "Mean / volatility"
+				mc_mean = mc2.number_input("Mean annual return", step=0.005, format="%.3f", key="mc_mean", disabled=use_historical)
+				mc_vol = mc3.number_input("Annual volatility", min_value=0.0, step=0.01, format="%.2f", key="mc_vol", disabled=use_historical)
+				mc_paths = mc4.select_slider("Paths", options=[10_000, 25_000, 50_000, 100_000], key="mc_paths")
+				mc_seed = mc5.number_input("Seed", min_value=0, step=1, key="mc_seed")
+
+				proj_chart = monte_carlo_png(
+					current_net_worth, monthly_invest, monthly_savings, projection_years,
+					mc_paths, mc_mean, mc_vol, use_historical, int(mc_seed)
+				)  # cached
+			else:
+				returns = (0.05, 0.07, 0.09)
+				proj_chart = projection_png(current_net_worth, monthly_invest, monthly_savings, projection_years, returns)  # cached
+			show_png(proj_chart)
+			return proj_chart
+
+		proj_chart = projection_section()
+
+		# 401K what-if, for Person 1 with everything else held fixed
+		other_monthly = monthly_income - noahs_income
+		contrib_chart = contribution_curve_png(
+			float(annual_salary), float(match_rate), float(hsa_monthly_in), float(healthcare_monthly_premium),
+			float(other_monthly), float(fixed + post_tax + save), float(pretax_401k_annual),
+			tax_rules.key
+		)  # cached
+		show_png(contrib_chart)
+
+
+		make_html = st.checkbox("Generate HTML report preview", value=False)
+
+		if make_html:
+			# the export embeds the cached chart PNGs (the preview above shows them with st.image)
+			export_html = make_budget_html(
+				**report_args,
+				pie_b64=png_to_base64(pie_chart) if pie_chart else None,
+				proj_b64=png_to_base64(proj_chart),
+			)
+			st.download_button(
+				"Download dashboard (.html)",
+				data=export_html.encode("utf-8"),
+				file_name="budget_dashboard.html",
+				mime="text/html"
+			)
 
 	
 
 with tab3:
-	st.title("Expenses")
-
-	CATEGORIES = [
-	    "Rent", "Utilities", "Groceries", "Dining", "Transportation", "Insurance",
-	    "Debt", "Subscriptions", "Health", "Clothes", "Entertainment", "Travel", "Gifts", "Other"
-	]
-
-	if not user_id:
-		st.info("Log in to track expenses.")
-		st.stop()
-
-    # Always ensure auth session before DB calls
-	restore_session(supabase)
-
-	st.subheader("Add an expense")
-
-	with st.form("add_expense_form", clear_on_submit=True):
-	    amount = st.number_input("Amount", min_value=0.0, step=1.0, format="%.2f", key="exp_amount")
-	    category = st.selectbox("Category", CATEGORIES, key="exp_category")
-	    expense_date = st.date_input("Date", value=date.today(), key="exp_date")
-	    note = st.text_input("Note (optional, max 100 characters)", max_chars=100, key="exp_note")
-	    submitted = st.form_submit_button("Add expense")
-
-	if submitted:
-	    expense_payload = {
-	        "id": user_id,
-	        "amount": float(amount),
-	        "category": category,
-	        "expense_date": expense_date.isoformat(),  # date -> 'YYYY-MM-DD',
-	        "Notes": note
-	        #"note": note.strip() if note else None,
-	    }
-
-	    supabase.table("expense_profile").insert(expense_payload).execute()
-	    clear_expense_cache()   # NEW
-	    st.success("Expense added.")
-	    st.rerun()
-
-	start_month = date.today().replace(day=1)
-	end_today = date.today()
-
-	df_m = fetch_expenses_month(user_id, start_month.isoformat(), end_today.isoformat())  # cached
-
-	if not df_m.empty:
-	    actual_by_cat = df_m.groupby("category")["amount"].sum().to_dict()
-	else:
-	    actual_by_cat = {}
-
-	total_over_budget = 0
-
-	total_budget = 0
-	total_spent = 0
-
-	st.subheader("This month: Budget vs Actual")
-
-	for budget_cat, expense_cats in BUDGET_MAP.items():
-		actual = sum(float(actual_by_cat.get(c, 0.0)) for c in expense_cats)
-		
-		budget_key = BUDGET_KEYS[budget_cat]
-		budget = float(st.session_state.get(budget_key, 0.0))
-
-	    # Skip truly empty lines
-		#if budget <= 0 and actual <= 0:
-		#	continue
-
-		total_budget += budget
-
-		if actual > budget:
-			total_over_budget += actual - budget
-
-		total_spent += actual
+	if tab3.open:
+		st.title("Expenses")
+
+		if not user_id:
+			st.info("Log in to track expenses.")
+			st.stop()
+
+		st.subheader("Add an expense")
+
+		with st.form("add_expense_form", clear_on_submit=True):
+		    amount = st.number_input("Amount", min_value=0.0, step=1.0, format="%.2f", key="exp_amount")
+		    category = st.selectbox("Category", CATEGORIES, key="exp_category")
+		    expense_date = st.date_input("Date", value=date.today(), key="exp_date")
+		    note = st.text_input("Note (optional, max 100 characters)", max_chars=100, key="exp_note")
+		    submitted = st.form_submit_button("Add expense")
+
+		if submitted:
+		    expense_payload = {
+		        "id": user_id,
+		        "amount": float(amount),
+		        "category": category,
+		        "expense_date": expense_date.isoformat(),  # date -> 'YYYY-MM-DD',
+		        "Notes": note
+		        #"note": note.strip() if note else None,
+		    }
+
+		    queue_expense(user_id, expense_payload)  # shows up now, saved in the background
+		    st.success("Expense added.")
+		    st.rerun()
+
+		write_status = get_write_queue(user_id).status()
+		if write_status["pending"]:
+			st.caption(f"Saving {write_status['pending']} expense(s)…")
+		if write_status["failed"]:
+			st.error(f"{write_status['failed']} expense(s) couldn't be saved ({write_status['error']}).")
+			if st.button("Retry saving", key="exp_retry_writes"):
+				get_write_queue(user_id).retry_failed()
+				st.rerun()
 
-		breakdown = None
-		if budget_cat == "Food":
-			breakdown = (
-				f'Groceries: {actual_by_cat.get("Groceries", 0.0):,.0f} | Dining: {actual_by_cat.get("Dining", 0.0):,.0f}'
+		with st.expander("Import a bank export (CSV / OFX)"):
+			upload = st.file_uploader("Bank export", type=["csv", "ofx", "qfx"], key="import_file")
+			sign_label = st.radio(
+				"Spending in this file is",
+				["Detect", "Negative amounts", "Positive amounts"],
+				horizontal=True,
+				key="import_sign",
 			)
-
-		fintech_bar(budget_cat, actual, budget, breakdown=breakdown)
-	fintech_bar("Guilt Free Spending", total_over_budget, guilt_free)
-	fintech_bar("Total Budget", total_spent, total_budget + guilt_free)
-
-	st.subheader("Your expenses")
-
-	colA, colB = st.columns(2)
-	with colA:
-	    start_date = st.date_input("From", value=date.today().replace(day=1), key="exp_from")
-	with colB:
-	    end_date = st.date_input("To", value=date.today(), key="exp_to")
-
-	# Fetch
-	restore_session(supabase)
-	
-
-	#Get total spending on per month basis
-	dfm = fetch_monthly_expense_totals()  # cached
-	if not dfm.empty:
-		dfm["month"] = pd.to_datetime(dfm["month"])
-		dfm["total"] = dfm["total"].astype(float)
-
-	rows = fetch_expenses_range(user_id, start_date.isoformat(), end_date.isoformat())  # cached
-	if not rows:
-	    st.write("No expenses in this range.")
-	else:
-
-		df = pd.DataFrame(rows)
-		df["expense_date"] = pd.to_datetime(df["expense_date"]).dt.date
-		df.drop(columns=['id','created_at', 'expense_id'],inplace=True)
-		df.columns = ['Expense Date', 'Category', 'Amount', 'Note']
-		df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").fillna(0.0)
-		st.dataframe(df, width='stretch')
-
-		st.subheader("Delete an expense")
-
-		def label(r):
-			note = (r.get("Notes") or "").strip()
-			note_part = f" - {note}" if note else ""
-			return f'{r["expense_date"]} • {r["category"]} • ${float(r["amount"]):,.2f}{note_part}'
-
-		options = [r["expense_id"] for r in rows]
-		labels = {r["expense_id"]: label(r) for r in rows}
-
-		delete_expense_id = st.selectbox(
-			"Choose expense",
-			options=options,
-			format_func=lambda eid: labels[eid],
+			if upload is not None:
+				expenses_are = {"Detect": "auto", "Negative amounts": "negative", "Positive amounts": "positive"}[sign_label]
+				try:
+					parsed = parse_upload(upload.getvalue(), upload.name, expenses_are)
+				except ValueError as e:
+					st.error(f"Couldn't read this file: {e}")
+					parsed = []
+
+				if parsed:
+					preview = pd.DataFrame(parsed)
+					st.write(
+						f"{len(parsed):,} expenses, {preview['expense_date'].min()} to {preview['expense_date'].max()}, "
+						f"${preview['amount'].sum():,.2f} total"
+					)
+					st.dataframe(
+						preview.groupby("category")["amount"].agg(["count", "sum"]).sort_values("sum", ascending=False),
+						width='stretch',
+					)
+					if st.button(f"Import {len(parsed):,} expenses", key="import_go"):
+						result = import_expenses(user_id, parsed)
+						st.success(f"Imported {result['inserted']:,} expenses ({result['skipped']:,} already saved).")
+						st.rerun()
+
+		df_m = data["month"]
+
+		if not df_m.empty:
+		    actual_by_cat = df_m.groupby("category")["amount"].sum().to_dict()
+		else:
+		    actual_by_cat = {}
+
+		st.subheader("This month: Budget vs Actual")
+
+		budgets = bucket_budgets(st.session_state)
+		bva = month_budget_vs_actual(df_m, budgets)
+
+		total_over_budget = bva["over_budget"].sum()
+		total_spent = bva["actual"].sum()
+		total_budget = bva["budget"].sum()
+
+		render_budget_bars(
+			list(bva.index) + ["Guilt Free Spending", "Total Budget"],
+			np.append(bva["actual"].to_numpy(), [total_over_budget, total_spent]),
+			np.append(bva["budget"].to_numpy(), [guilt_free, total_budget + guilt_free]),
+			breakdowns=category_breakdowns(actual_by_cat),
 		)
 
-		confirm = st.checkbox("I understand this will permanently delete the expense.")
-
-		if st.button("Delete selected expense", disabled = not confirm):
-			restore_session(supabase)
-			supabase.table("expense_profile").delete().eq("expense_id", delete_expense_id).execute()
-			clear_expense_cache()   # NEW
-			st.success("Deleted.")
-			st.rerun()
-
-		total_spent = float(df['Amount'].sum())
-
-		amount_by_cat = df.groupby('Category')['Amount'].sum().reset_index()
-		cats = amount_by_cat['Category'].values 
-		amounts = amount_by_cat['Amount'].values.astype(float)
+		with st.expander("Budget vs actual, last 12 months"):
+			first_month = (pd.Timestamp.today().to_period("M") - 11).strftime("%Y-%m")
+			history = fetch_budget_history(user_id, budgets, first_month)
+			if history.empty:
+				st.write("No expenses in the last 12 months.")
+			else:
+				# one row per month: spending per bucket, then totals against the monthly budget
+				by_month = history["actual"].unstack("bucket")[list(bva.index)]
+				by_month["Total spent"] = history["actual"].groupby(level="month").sum()
+				by_month["Over budget"] = history["over_budget"].groupby(level="month").sum()
+				st.dataframe(
+					by_month.sort_index(ascending=False),
+					width='stretch',
+					column_config={c: st.column_config.NumberColumn(c, format="$%.0f") for c in by_month.columns},
+				)
+
+		st.subheader("Your expenses")
+
+		colA, colB = st.columns(2)
+		with colA:
+		    start_date = st.date_input("From", key="exp_from")
+		with colB:
+		    end_date = st.date_input("To", key="exp_to")
+
+		# Fetch
+	
 
-		fig_s, ax_s = plt.subplots(1, 2, figsize=(14, 7))
+		#Get total spending on per month basis
+		dfm = data["monthly_totals"]  # already typed by the fetch; shared cache object, don't mutate
+
+		start_iso, end_iso = start_date.isoformat(), end_date.isoformat()
+
+		# Keyset pages, newest first: the cursor list grows by one per "Load older"
+		page_size = st.selectbox("Rows per page", [50, 100, 250, 500], key="exp_page_size")
+		view = (start_iso, end_iso, page_size)
+		if st.session_state.get("exp_view") != view:
+			st.session_state["exp_view"] = view
+			st.session_state["exp_cursors"] = [None]
+
+		rows, next_cursor = [], None
+		for cursor in st.session_state["exp_cursors"]:
+			page, next_cursor = fetch_expenses_page(user_id, start_iso, end_iso, page_size, before=cursor)
+			rows.extend(page)
+		total_rows = fetch_expense_count(user_id, start_iso, end_iso)
+
+		if not rows:
+		    st.write("No expenses in this range.")
+		else:
+
+			df = pd.DataFrame({
+				"Select": False,
+				"Expense Date": pd.to_datetime([r["expense_date"] for r in rows]).date,
+				"Category": [r["category"] for r in rows],
+				"Amount": pd.to_numeric(pd.Series([r["amount"] for r in rows]), errors="coerce").fillna(0.0).values,
+				"Note": [r.get("Notes") or "" for r in rows],
+			}, index=pd.Index([str(r["expense_id"]) for r in rows], name="expense_id"))
+			# Arrow needs one index type; saved ids are ints, queued ones are strings
+			row_ids = {str(r["expense_id"]): r["expense_id"] for r in rows}
+
+			# bumping the version resets the editor's pending edits after a save
+			editor_version = st.session_state.setdefault("exp_editor_version", 0)
+			edited = st.data_editor(
+				df,
+				key=f"exp_editor_{editor_version}",
+				width='stretch',
+				hide_index=True,
+				disabled=["Expense Date", "Amount", "Note"],
+				column_config={
+					"Select": st.column_config.CheckboxColumn("Select", width="small"),
+					"Category": st.column_config.SelectboxColumn("Category", options=CATEGORIES, required=True),
+					"Amount": st.column_config.NumberColumn("Amount", format="$%.2f"),
+				},
+			)
 
-		ax_s[0].barh(cats,amounts)
-		ax_s[0].set_title(f"Total Spent in {start_date} - {end_date}: {total_spent}$", fontsize=12, pad=20)
-		ax_s[0].set_xlabel('Amount spent ($)')
-		for i, v in enumerate(amounts):
-			ax_s[0].text(v, i, f" ${v:,.0f}", va="center")
+			if next_cursor is not None:
+				def load_older(cursor=next_cursor):
+					st.session_state["exp_cursors"].append(cursor)
+
+				st.button(
+					f"Load older ({len(rows):,} of {total_rows:,} shown)",
+					on_click=load_older,
+					key="exp_load_older",
+				)
+			else:
+				st.caption(f"{total_rows:,} expenses")
+
+			selected = [row_ids[i] for i in edited.index[edited["Select"]]]
+			recategorized = {row_ids[i]: c for i, c in edited["Category"][edited["Category"] != df["Category"]].items()}
+			if any(is_pending(eid) for eid in recategorized):
+				st.caption("Expenses that are still saving can't be re-categorized yet.")
+
+			st.subheader("Edit selected expenses")
+			ed1, ed2, ed3 = st.columns([2, 1, 1])
+			bulk_category = ed1.selectbox("Re-categorize selected to", ["(keep)"] + CATEGORIES, key="exp_bulk_category")
+			if bulk_category != "(keep)":
+				recategorized.update({eid: bulk_category for eid in selected})
+
+			if ed2.button(f"Save category changes ({len(recategorized)})", disabled=not recategorized, key="exp_save_categories", width='stretch'):
+				update_expense_categories(user_id, recategorized)
+				st.session_state["exp_editor_version"] += 1
+				st.success(f"Updated {len(recategorized)} expenses.")
+				st.rerun()
 
-		ax_s[1].bar(dfm["month"], dfm["total"])
-		ax_s[1].set_title(f"Total Spending per month")
-		ax_s[1].set_xlabel('Month')
-		ax_s[1].set_ylabel('Spending ($)')
-		#ax_s[1].set_xticklabels(dfm["month"],rotation=45, ha='right')
-		ax_s[1].xaxis.set_major_locator(mdates.MonthLocator())
-		ax_s[1].xaxis.set_major_formatter(mdates.DateFormatter("%m/%y"))
+			confirm = ed3.checkbox("I understand this will permanently delete the selected expenses.", key="exp_confirm_delete")
+			if ed3.button(f"Delete selected ({len(selected)})", disabled=not (confirm and selected), key="exp_delete_selected", width='stretch'):
+				delete_expenses(user_id, selected)
+				st.session_state["exp_editor_version"] += 1
+				st.success(f"Deleted {len(selected)} expenses.")
+				st.rerun()
 
-		plt.setp(ax_s[1].get_xticklabels(), rotation=45, ha="right")
-		plt.setp(ax_s[0].get_xticklabels(), rotation=45, ha="right")
+			# totals for the whole range come from the ledger's running aggregates, not the loaded pages
+			amount_by_cat = sorted(fetch_category_totals(user_id, start_iso, end_iso).items())
+			cats = tuple(c for c, _ in amount_by_cat)
+			amounts = tuple(float(a) for _, a in amount_by_cat)
+			total_spent = round(sum(amounts), 2)
 
-		st.pyplot(fig_s, clear_figure=True)
+			spend_chart = expense_png(
+				cats,
+				amounts,
+				f"Total Spent in {start_date} - {end_date}: {total_spent}$",
+				tuple(dfm["month"].dt.strftime("%Y-%m-%d")),
+				tuple(dfm["total"]),
+			)  # cached
+			show_png(spend_chart)
 
 
-		#st.metric("Total in range", f"${df['Amount'].sum():,.2f}")
+			#st.metric("Total in range", f"${df['Amount'].sum():,.2f}")
 
-# Cleanup matplotlib objects
-if pie_fig is not None:
-    plt.close(pie_fig)
-if proj_fig is not None:
-    plt.close(proj_fig)
-if fig_s is not None:
-    plt.close(fig_s)
+timings_panel(rerun_started)
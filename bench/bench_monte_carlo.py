@@ -0,0 +1,44 @@
+"""
+Timing for the Monte Carlo projection.
+
+    python bench/bench_monte_carlo.py [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monte_carlo import simulate_net_worth, load_annual_returns
+
+
+CASES = [
+    # (years, paths)
+    (10, 10_000),
+    (40, 10_000),
+    (40, 50_000),
+    (40, 100_000),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    historical = load_annual_returns()
+
+    print(f"{'model':<12} {'years':>5} {'paths':>8} {'best ms':>9} {'P50 at end':>14}")
+    for model, hist in (("lognormal", None), ("bootstrap", historical)):
+        for years, paths in CASES:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                _, bands = simulate_net_worth(50_000, 1_500, 200, years, n_paths=paths, historical=hist, seed=0)
+                best = min(best, time.perf_counter() - start)
+            print(f"{model:<12} {years:>5} {paths:>8,} {best * 1000:>9.1f} {bands[1, -1]:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
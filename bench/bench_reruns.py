@@ -0,0 +1,263 @@
+"""
+Rerun latency of app.py under Streamlit's AppTest, against an in-process fake
+Supabase (bench/fake_supabase.py) or the SQLite repository.
+
+For each data size a fresh user is seeded, the app is run once cold, and then
+every interaction below is repeated --runs times; each sample is one full
+at.run() with the interaction's tab open (only the open tab runs; "all" is the
+default tab). Results go to JSON so runs can be compared across commits.
+
+    python bench/bench_reruns.py [--sizes 100 1000 10000 100000] [--runs 15]
+                                 [--backend fake|sqlite] [--out FILE] [--compare OLD.json] [--spans]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import streamlit as st
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+
+import fake_supabase
+import timing
+from repository import SqliteRepository
+
+
+APP = os.path.join(ROOT, "app.py")
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+
+
+TAB_KEY = "active_tab"
+TAB_LABELS = {"setup": "Set up Budget", "dashboard": "Dashboard", "expenses": "Expense Tracker"}
+
+
+def _open_tab(at, tab):
+    # AppTest doesn't send the tabs' state back like a browser does, so every run names the open tab
+    if tab in TAB_LABELS:
+        at.session_state[TAB_KEY] = TAB_LABELS[tab]
+
+
+# --- interactions: (tab, name, prepare(at, i)); each is followed by a timed at.run() ---
+def _rerun(at, i):
+    pass
+
+def _salary(at, i):
+    # a new value every time, so the cached charts miss like a real edit
+    at.number_input(key="annual_salary").set_value(90_000.0 + 250.0 * (i + 1))
+
+def _tax_state(at, i):
+    at.selectbox(key="tax_state").set_value(("IL", "OH", "PA", "MI")[i % 4])
+
+def _projection_mode(at, i):
+    radio = at.radio(key="projection_mode")
+    radio.set_value(radio.options[(i + 1) % 2])
+
+def _monte_carlo_seed(at, i):
+    radio = at.radio(key="projection_mode")
+    radio.set_value(radio.options[1])
+    if i:  # the widget only exists once Monte Carlo is on
+        at.number_input(key="mc_seed").set_value(i)
+
+def _fixed_returns(at, i):
+    radio = at.radio(key="projection_mode")
+    radio.set_value(radio.options[0])
+
+def _date_range(at, i):
+    start = (date.today().replace(day=1) - timedelta(days=31 * (i % 24 + 1))).replace(day=1)
+    at.date_input(key="exp_from").set_value(start)
+
+def _page_size(at, i):
+    at.selectbox(key="exp_page_size").set_value((100, 250, 500, 50)[i % 4])
+
+def _load_older(at, i):
+    older = [b for b in at.button if b.key == "exp_load_older"]
+    if older:
+        older[0].click()
+
+def _add_expense(at, i):
+    at.number_input(key="exp_amount").set_value(10.0 + i)
+    at.text_input(key="exp_note").input(f"bench add {i}")
+    next(b for b in at.button if b.label == "Add expense").click()
+
+
+INTERACTIONS = [
+    ("all", "rerun", _rerun),
+    ("setup", "salary", _salary),
+    ("setup", "tax_state", _tax_state),
+    ("dashboard", "projection_mode", _projection_mode),
+    ("dashboard", "monte_carlo_seed", _monte_carlo_seed),
+    ("dashboard", "fixed_returns", _fixed_returns),
+    ("expenses", "date_range", _date_range),
+    ("expenses", "page_size", _page_size),
+    ("expenses", "load_older", _load_older),
+    ("expenses", "add_expense", _add_expense),
+]
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _summary(samples):
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "n": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def _app(user_id, sqlite_path):
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.secrets["SUPABASE_URL"] = "https://bench.invalid"
+    at.secrets["SUPABASE_KEY"] = "bench"
+    if sqlite_path:
+        at.secrets["SQLITE_PATH"] = sqlite_path
+    at.session_state["sb_access_token"] = fake_supabase.access_token(user_id)
+    at.session_state["sb_refresh_token"] = "refresh-" + user_id
+    return at
+
+
+def _run(at, label):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{label}: {at.exception[0].value}")
+    return elapsed
+
+
+def bench_size(n_expenses, runs, sqlite_path):
+    user_id = f"bench-{n_expenses}"
+    start = time.perf_counter()
+    if sqlite_path:
+        repo = SqliteRepository(sqlite_path)
+        repo.save_profile_data(user_id, fake_supabase.BENCH_PROFILE)
+        repo.set_display_name(user_id, "Bench")
+        repo.insert_expenses(fake_supabase.expense_rows(user_id, n_expenses))
+    else:
+        fake_supabase.seed_user(user_id, n_expenses)
+    seed_s = time.perf_counter() - start
+
+    # every size starts from empty caches (charts, ledgers, client pool)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    at = _app(user_id, sqlite_path)
+    cold = _run(at, "cold")
+    warm = _run(at, "warm")
+
+    interactions = {}
+    for tab, name, prepare in INTERACTIONS:
+        _open_tab(at, tab)
+        _run(at, f"{tab}/open")  # the tab's widgets, for prepare() to find
+        samples = []
+        for i in range(runs):
+            prepare(at, i)
+            _open_tab(at, tab)
+            samples.append(_run(at, f"{tab}/{name}"))
+        interactions[f"{tab}/{name}"] = _summary(samples)
+
+    queue = at.session_state["expense_write_queue"] if "expense_write_queue" in at.session_state else None
+    if queue is not None:
+        queue.flush(timeout=30)
+
+    result = {
+        "expenses": n_expenses,
+        "seed_s": round(seed_s, 3),
+        "cold_ms": round(cold * 1000.0, 2),
+        "first_warm_ms": round(warm * 1000.0, 2),
+        "interactions": interactions,
+    }
+    if timing.ENABLED:
+        # every span of every run above, cold included
+        result["spans"] = at.session_state[timing.SESSION_KEY].rows()
+    return result
+
+
+def _print(result):
+    print(f"\n{result['expenses']:,} expenses   cold {result['cold_ms']:,.0f} ms   first warm {result['first_warm_ms']:,.0f} ms")
+    print(f"  {'interaction':<30} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, s in result["interactions"].items():
+        print(f"  {name:<30} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['max_ms']:>9.1f}")
+
+
+def _compare(report, old_path):
+    with open(old_path) as f:
+        old = {r["expenses"]: r for r in json.load(f)["results"]}
+    print(f"\np50 vs {old_path}")
+    for result in report["results"]:
+        before = old.get(result["expenses"])
+        if before is None:
+            continue
+        print(f"  {result['expenses']:,} expenses")
+        for name, s in result["interactions"].items():
+            prev = before["interactions"].get(name)
+            if prev and prev["p50_ms"]:
+                change = 100.0 * (s["p50_ms"] - prev["p50_ms"]) / prev["p50_ms"]
+                print(f"    {name:<30} {prev['p50_ms']:>9.1f} -> {s['p50_ms']:>9.1f} ms ({change:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--backend", choices=("fake", "sqlite"), default="fake")
+    parser.add_argument("--out", help="JSON output (default bench/results/reruns-<commit>.json)")
+    parser.add_argument("--compare", help="an earlier JSON output to diff p50s against")
+    parser.add_argument("--spans", action="store_true", help="also record the app's timing spans (see timing.py)")
+    args = parser.parse_args()
+
+    if args.spans:
+        timing.enable()
+
+    streamlit.logger.set_log_level("error")  # deprecation notices on every rerun
+    fake_supabase.install()
+    sqlite_path = os.path.join(tempfile.mkdtemp(prefix="bench-reruns-"), "budget.db") if args.backend == "sqlite" else None
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "backend": args.backend,
+        "runs": args.runs,
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+        "machine": platform.machine(),
+        "results": [],
+    }
+    for n in args.sizes:
+        result = bench_size(n, args.runs, sqlite_path)
+        report["results"].append(result)
+        _print(result)
+
+    out = args.out or os.path.join(ROOT, "bench", "results", f"reruns-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {out}")
+
+    if args.compare:
+        _compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Timing for the tax rule registry: parse once, then switch rule sets and recompute.
+
+    python bench/bench_tax_rules.py [--repeat 5] [--switches 10000]
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from income_calc import income_c, income_c_array
+from tax_rules import load_registry
+
+
+BUDGET_MS = 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--switches", type=int, default=10_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    registry = load_registry()
+    print(f"load_registry: {(time.perf_counter() - start) * 1000:.2f} ms (once per process)")
+
+    keys = [
+        (year, status, state)
+        for year in registry.years
+        for status in registry.filing_statuses(year)
+        for state in registry.states(year)
+    ]
+    cycle = list(itertools.islice(itertools.cycle(keys), args.switches))
+    sweep = np.linspace(0.0, 24_500.0, 2_000)
+
+    def dashboard(key):
+        # what a Setup-tab change recomputes: both incomes under the new rules
+        rules = registry.rules(*key)
+        income_c(90_000, 6_000, 0.04, 100, 200, rules=rules)
+        income_c(65_000, 3_000, 0.03, 0, 150, rules=rules)
+
+    def dashboard_with_curve(key):
+        rules = registry.rules(*key)
+        dashboard(key)
+        income_c_array(90_000, sweep, 0.04, 100, 200, rules=rules)
+
+    print(f"{len(keys)} rule sets, {args.switches:,} switches per run")
+    print(f"{'case':<38} {'best us/switch':>15} {'< 1 ms':>7}")
+    for name, fn in (("lookup only", lambda k: registry.rules(*k)),
+                     ("switch + 2x income_c", dashboard),
+                     ("switch + 2x income_c + 2000-pt curve", dashboard_with_curve)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for key in cycle:
+                fn(key)
+            best = min(best, (time.perf_counter() - start) / len(cycle))
+        print(f"{name:<38} {best * 1e6:>15.2f} {'yes' if best * 1000 < BUDGET_MS else 'NO':>7}")
+
+
+if __name__ == "__main__":
+    main()
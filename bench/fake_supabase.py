@@ -0,0 +1,303 @@
+"""
+In-process stand-in for the Supabase client: auth plus the budget_profile /
+expense_profile tables and the monthly_expense_totals RPC, with just enough
+of the PostgREST query builder for SupabaseRepository.
+
+    import fake_supabase
+    fake_supabase.install()            # supabase_pool now builds FakeClients
+    fake_supabase.seed_user("u1", 10_000)
+    token = fake_supabase.access_token("u1")
+"""
+import base64
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from budget_map import CATEGORIES
+
+
+class FakeDatabase:
+    """Tables as lists of dicts. expense_profile stays sorted by (created_at, expense_id)."""
+
+    def __init__(self):
+        self.tables = {"budget_profile": [], "expense_profile": []}
+        self.lock = threading.Lock()
+        self.calls = []                   # (table or "rpc"/"auth", operation)
+        self._ids = itertools.count(1)
+        self._clock = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def created_at(self) -> str:
+        # strictly increasing and fixed-width, so string order == time order
+        self._clock = max(self._clock + timedelta(microseconds=1), datetime.now(timezone.utc))
+        return self._clock.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+DB = FakeDatabase()
+
+
+def _created_key(row):
+    return (row["created_at"], row["expense_id"])
+
+
+class FakeQuery:
+    def __init__(self, db: FakeDatabase, table: str):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.payload = None
+        self.conflict = None
+        self.filters = []
+        self.keyset = None               # (created_at, expense_id) lower bound, exclusive
+        self.orders = []
+        self.limit_n = None
+        self.single_row = False
+
+    # --- builder ---
+    def select(self, columns="*", **kwargs):
+        self.columns = columns
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **kwargs):
+        self.op, self.payload, self.conflict = "upsert", payload, on_conflict
+        return self
+
+    def update(self, payload, **kwargs):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self, **kwargs):
+        self.op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: str(r.get(column)) > str(value))
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    _KEYSET = re.compile(r'created_at\.gt\."([^"]+)",and\(created_at\.eq\."([^"]+)",expense_id\.gt\.(\d+)\)')
+
+    def or_(self, expression, **kwargs):
+        match = self._KEYSET.fullmatch(expression)
+        if match is None:
+            raise NotImplementedError(f"fake or_ only understands the ledger keyset: {expression}")
+        self.keyset = (match.group(1), int(match.group(3)))
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    # --- execution ---
+    def _matches(self, rows):
+        start = 0
+        if self.keyset is not None:
+            start = bisect_right(rows, self.keyset, key=_created_key)
+        return (r for r in itertools.islice(rows, start, None) if all(f(r) for f in self.filters))
+
+    def execute(self):
+        db = self.db
+        with db.lock:
+            db.calls.append((self.table, self.op))
+            rows = db.tables[self.table]
+
+            if self.op in ("insert", "upsert"):
+                payload = self.payload if isinstance(self.payload, list) else [self.payload]
+                out = []
+                for p in payload:
+                    old = None
+                    if self.conflict and p.get(self.conflict) is not None:
+                        old = next((r for r in rows if r.get(self.conflict) == p[self.conflict]), None)
+                    if old is not None:
+                        old.update(p)
+                        out.append(dict(old))
+                        continue
+                    row = dict(p)
+                    if self.table == "expense_profile":
+                        row.setdefault("expense_id", db.next_id())
+                        row["created_at"] = db.created_at()
+                    rows.append(row)
+                    out.append(dict(row))
+                return SimpleNamespace(data=out)
+
+            if self.op == "update":
+                matched = list(self._matches(rows))
+                for r in matched:
+                    r.update(self.payload)
+                return SimpleNamespace(data=[dict(r) for r in matched])
+
+            if self.op == "delete":
+                gone = {id(r) for r in self._matches(rows)}
+                db.tables[self.table] = [r for r in rows if id(r) not in gone]
+                return SimpleNamespace(data=[])
+
+            ordered_by_creation = self.orders == [("created_at", False), ("expense_id", False)]
+            if ordered_by_creation and self.table == "expense_profile":
+                # already stored in that order: stop at the limit
+                out = list(itertools.islice(self._matches(rows), self.limit_n))
+            else:
+                out = list(self._matches(rows))
+                for column, desc in reversed(self.orders):
+                    out.sort(key=lambda r: r.get(column), reverse=desc)
+                if self.limit_n is not None:
+                    out = out[:self.limit_n]
+            out = [dict(r) for r in out]
+            if self.single_row:
+                return SimpleNamespace(data=out[0] if out else None)
+            return SimpleNamespace(data=out)
+
+
+def access_token(user_id: str, ttl: int = 3600) -> str:
+    """An unsigned JWT with the claims supabase_pool reads (sub, exp)."""
+    def part(claims):
+        return base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"{part({'alg': 'HS256'})}.{part({'sub': user_id, 'exp': int(time.time()) + ttl, 'email': user_id + '@example.com'})}.fake"
+
+
+def _claims(token: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(token.split(".")[1] + "==="))
+
+
+class FakeAuth:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.session = None
+        self.admin = SimpleNamespace(sign_out=self._admin_sign_out)
+
+    def _session(self, token, refresh_token):
+        sub = _claims(token)["sub"]
+        user = SimpleNamespace(id=sub, email=sub + "@example.com")
+        return SimpleNamespace(access_token=token, refresh_token=refresh_token, expires_at=int(time.time()) + 3600, user=user)
+
+    def _response(self):
+        return SimpleNamespace(session=self.session, user=self.session.user if self.session else None)
+
+    def set_session(self, token, refresh_token):
+        self.db.calls.append(("auth", "set_session"))
+        self.session = self._session(token, refresh_token)
+        return self._response()
+
+    def refresh_session(self, refresh_token=None):
+        self.db.calls.append(("auth", "refresh_session"))
+        user_id = refresh_token.removeprefix("refresh-")
+        self.session = self._session(access_token(user_id), refresh_token)
+        return self._response()
+
+    def get_claims(self, jwt=None):
+        self.db.calls.append(("auth", "get_claims"))
+        return SimpleNamespace(claims=_claims(jwt))
+
+    def get_user(self, jwt=None):
+        self.db.calls.append(("auth", "get_user"))
+        return SimpleNamespace(user=self.session.user) if self.session else None
+
+    def sign_in_with_password(self, credentials):
+        self.db.calls.append(("auth", "sign_in_with_password"))
+        user_id = credentials["email"].split("@")[0]
+        self.session = self._session(access_token(user_id), "refresh-" + user_id)
+        return self._response()
+
+    def sign_up(self, credentials):
+        return self.sign_in_with_password(credentials)
+
+    def sign_out(self):
+        self.session = None
+
+    def _admin_sign_out(self, jwt, scope="global"):
+        self.db.calls.append(("auth", "admin_sign_out"))
+
+
+class FakeClient:
+    def __init__(self, db: FakeDatabase = None):
+        self.db = db or DB
+        self.auth = FakeAuth(self.db)
+        self.options = SimpleNamespace(headers={})
+        self.postgrest = SimpleNamespace(auth=lambda token: None)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self.db, name)
+
+    def rpc(self, name: str, params: dict):
+        def execute():
+            self.db.calls.append(("rpc", name))
+            bearer = self.options.headers.get("Authorization", "").removeprefix("Bearer ")
+            user_id = _claims(bearer)["sub"] if bearer else None
+            start, end = params.get("start_date"), params.get("end_date")
+            totals = {}
+            with self.db.lock:
+                for r in self.db.tables["expense_profile"]:
+                    day = str(r["expense_date"])[:10]
+                    if r["id"] == user_id and (not start or day >= start) and (not end or day <= end):
+                        totals[day[:7] + "-01"] = totals.get(day[:7] + "-01", 0.0) + float(r["amount"])
+            return SimpleNamespace(data=[{"month": m, "total": t} for m, t in sorted(totals.items())])
+        return SimpleNamespace(execute=execute)
+
+
+def install(db: FakeDatabase = None):
+    """Makes supabase_pool build FakeClients (call before the app first connects)."""
+    import supabase_pool
+    supabase_pool.create_client = lambda *args, **kwargs: FakeClient(db or DB)
+
+
+BENCH_PROFILE = {
+    "annual_salary": 90_000.0, "pretax_401k_annual": 6_000.0, "match_rate": 0.04,
+    "hsa_monthly_in": 100.0, "healthcare_monthly_premium": 200.0,
+    "rent_in": 1_500.0, "utilities_in": 150.0, "insurance_in": 120.0, "trans_travel_in": 250.0,
+    "food_in": 500.0, "clothes_in": 80.0, "phone_in": 60.0, "subs_in": 40.0, "gifts_in": 50.0,
+    "roth_in": 300.0, "stocks_in": 400.0, "emergency_in": 200.0, "vacations_in": 100.0,
+    "current_cash": 10_000.0, "current_investments": 50_000.0,
+}
+
+
+def expense_rows(user_id: str, n: int, years: int = 5, seed: int = 0) -> list:
+    """n random expenses spread over the last `years` years, oldest first."""
+    rng = random.Random(seed)
+    today = date.today()
+    days = [today - timedelta(days=rng.randrange(years * 365)) for _ in range(n)]
+    days.sort()
+    return [
+        {
+            "id": user_id,
+            "expense_date": d.isoformat(),
+            "category": rng.choice(CATEGORIES),
+            "amount": round(rng.uniform(2, 150), 2),
+            "Notes": f"bench {i}",
+        }
+        for i, d in enumerate(days)
+    ]
+
+
+def seed_user(user_id: str, n_expenses: int, db: FakeDatabase = None, profile: dict = None, seed: int = 0):
+    db = db or DB
+    client = FakeClient(db)
+    with db.lock:
+        db.tables["budget_profile"].append({"id": user_id, "display_name": "Bench", "data": dict(profile or BENCH_PROFILE)})
+    client.table("expense_profile").insert(expense_rows(user_id, n_expenses, seed=seed)).execute()
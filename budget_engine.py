@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from budget_map import BUDGET_MAP, BUDGET_KEYS
+
+
+BUCKETS = tuple(BUDGET_MAP)
+UNBUDGETED = len(BUCKETS)  # code for categories no bucket covers
+
+# reverse index: expense category -> bucket code
+BUCKET_OF = {category: i for i, bucket in enumerate(BUCKETS) for category in BUDGET_MAP[bucket]}
+
+
+def bucket_codes(categories) -> np.ndarray:
+    """Bucket code per category (UNBUDGETED if no bucket covers it)."""
+    codes, uniques = pd.factorize(pd.Series(categories, dtype=object))
+    # one dict lookup per distinct category; the trailing UNBUDGETED catches code -1 (missing)
+    lookup = np.array([BUCKET_OF.get(c, UNBUDGETED) for c in uniques] + [UNBUDGETED], dtype=np.intp)
+    return lookup[codes]
+
+
+def bucket_budgets(state) -> np.ndarray:
+    """Monthly budget per bucket, read from a mapping with BUDGET_KEYS (e.g. st.session_state)."""
+    return np.array([float(state.get(BUDGET_KEYS[bucket], 0.0) or 0.0) for bucket in BUCKETS])
+
+
+def budget_vs_actual(months, categories, amounts, budgets) -> pd.DataFrame:
+    """
+    Actual vs budget for every bucket in every month, in one np.bincount pass.
+
+    months, categories, amounts : parallel sequences, one per expense (or per month/category total)
+    budgets                     : monthly budget per bucket, in BUCKETS order
+
+    Returns a frame indexed by (month, bucket) with actual, budget, over_budget and remaining.
+    Spending in categories no bucket covers is dropped, as the bars have nowhere to show it.
+    """
+    month_codes, month_labels = pd.factorize(pd.Series(months, dtype=object), sort=True)
+    codes = month_codes * (UNBUDGETED + 1) + bucket_codes(categories)
+    n_months = len(month_labels)
+
+    actual = np.bincount(
+        codes, weights=np.asarray(amounts, dtype=float), minlength=n_months * (UNBUDGETED + 1)
+    ).reshape(n_months, UNBUDGETED + 1)[:, :UNBUDGETED]
+    budget = np.broadcast_to(np.asarray(budgets, dtype=float), actual.shape)
+
+    index = pd.MultiIndex.from_product([month_labels, BUCKETS], names=["month", "bucket"])
+    return pd.DataFrame({
+        "actual": actual.ravel(),
+        "budget": budget.ravel(),
+        "over_budget": np.maximum(actual - budget, 0.0).ravel(),
+        "remaining": (budget - actual).ravel(),
+    }, index=index)
+
+
+def month_budget_vs_actual(df: pd.DataFrame, budgets) -> pd.DataFrame:
+    """budget_vs_actual for one month's expense frame (expense_date, category, amount), indexed by bucket."""
+    if df.empty:
+        return budget_vs_actual(["-"], [None], [0.0], budgets).droplevel("month")
+    # one month: the month column is constant, so skip parsing dates
+    return budget_vs_actual(np.zeros(len(df), dtype=np.intp), df["category"].to_numpy(), df["amount"].to_numpy(), budgets).droplevel("month")
+
+
+def category_breakdowns(actual_by_cat: dict) -> dict:
+    """{bucket: "Groceries: 120 | Dining: 80"} for buckets that combine more than one category."""
+    return {
+        bucket: " | ".join(f"{c}: {actual_by_cat.get(c, 0.0):,.0f}" for c in categories)
+        for bucket, categories in BUDGET_MAP.items()
+        if len(categories) > 1
+    }
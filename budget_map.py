@@ -1,3 +1,8 @@
+CATEGORIES = [
+    "Rent", "Utilities", "Groceries", "Dining", "Transportation", "Insurance",
+    "Debt", "Subscriptions", "Health", "Clothes", "Entertainment", "Travel", "Gifts", "Other"
+]
+
 BUDGET_MAP = {
     "Food": ["Groceries", "Dining"],   # combined
     "Transportation": ["Transportation", "Travel"],
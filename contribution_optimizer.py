@@ -0,0 +1,127 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from income_calc import income_c_array, DEFAULT_RULES
+from projection import projection_arrays
+
+
+@dataclass(frozen=True)
+class ContributionPlan:
+    pretax_401k_annual: float
+    roth_monthly: float
+    stocks_monthly: float
+    guilt_free_monthly: float
+    net_worth: float        # projected, at the target year
+    feasible: bool          # every target met
+    limited_by: str         # the binding target: "net_worth", "guilt_free" or "income" (can't afford it)
+
+    @property
+    def weekly_guilt_free(self):
+        return self.guilt_free_monthly / 4
+
+
+def _breakpoints(gross, cap, hsa_annual, healthcare_annual, rules):
+    """401K amounts in (0, cap) where the federal or state marginal rate changes."""
+    federal = gross - rules.federal.standard_deduction - hsa_annual - healthcare_annual - np.asarray(rules.federal.schedule.lowers)
+    state = gross - rules.state.exemption - hsa_annual - healthcare_annual - np.asarray(rules.state.schedule.lowers)
+    points = np.concatenate(([0.0, cap], federal, state))
+    return np.unique(points[(points >= 0.0) & (points <= cap)])
+
+
+def solve_contributions(
+    gross_income,
+    match401k_rate,
+    HSA_cont_monthly,
+    healthcare_cost_permonth,
+    other_monthly_income,
+    outflows_monthly,
+    current_net_worth,
+    years,
+    target_net_worth=None,
+    min_weekly_guilt_free=None,
+    annual_return=0.07,
+    monthly_savings=0.0,
+    other_invest_monthly=0.0,
+    rules=None,
+):
+    """
+    Chooses the 401K contribution and the monthly Roth/stock amounts.
+
+    other_monthly_income : take-home money not from this salary (second income, other income)
+    outflows_monthly     : fixed costs + savings + any post-tax investing the solver doesn't choose
+    monthly_savings      : the savings part of outflows (earns 0% in the projection)
+    other_invest_monthly : invested money the solver doesn't choose (second 401K/HSA, other post-tax)
+
+    A pre-tax dollar costs (1 - marginal rate) of take-home, a post-tax dollar costs a
+    dollar, and both grow the same in projection_arrays, so the 401K is filled first.
+
+    - target_net_worth only: the least investing that reaches it (max guilt-free spending).
+    - min_weekly_guilt_free only: invest everything above that floor (max net worth).
+    - both: the first, unless it breaks the floor; then the second, flagged infeasible.
+
+    Take-home is piecewise linear in the 401K amount (kinks at bracket edges), so the
+    floor is solved exactly by evaluating those kinks and interpolating within one piece.
+    """
+    if target_net_worth is None and min_weekly_guilt_free is None:
+        raise ValueError("give a target net worth, a minimum weekly guilt-free amount, or both")
+    rules = rules or DEFAULT_RULES
+
+    gross = float(gross_income)
+    cap = min(rules.federal.limit_401k, gross)
+    hsa_annual = HSA_cont_monthly * 12
+    healthcare_annual = healthcare_cost_permonth * 12
+    match_monthly = gross * match401k_rate / 12 if gross else 0.0
+
+    def guilt_free(cont401k):
+        # with no post-tax investing
+        take_home, _, _ = income_c_array(gross, cont401k, match401k_rate, HSA_cont_monthly, healthcare_cost_permonth, rules=rules)
+        return take_home + other_monthly_income - outflows_monthly
+
+    # net worth at `years` is base + annuity * (monthly amount invested)
+    _, _, _, fv = projection_arrays(current_net_worth, 0.0, monthly_savings, years, (annual_return,))
+    base = float(fv[0, -1])
+    annuity = float(projection_arrays(0.0, 1.0, 0.0, years, (annual_return,))[3][0, -1])
+    invest_fixed = HSA_cont_monthly + match_monthly + other_invest_monthly
+
+    def plan(cont401k, post_tax, feasible, limited_by):
+        cont401k = float(cont401k)
+        post_tax = max(float(post_tax), 0.0)
+        roth = min(post_tax, rules.federal.limit_ira / 12)
+        net_worth = base + annuity * (invest_fixed + cont401k / 12 + post_tax)
+        return ContributionPlan(
+            pretax_401k_annual=round(cont401k, 2),
+            roth_monthly=round(roth, 2),
+            stocks_monthly=round(post_tax - roth, 2),
+            guilt_free_monthly=float(guilt_free(cont401k)) - post_tax,
+            net_worth=net_worth,
+            feasible=feasible,
+            limited_by=limited_by,
+        )
+
+    floor = None if min_weekly_guilt_free is None else min_weekly_guilt_free * 4
+
+    if target_net_worth is not None:
+        needed = max((target_net_worth - base) / annuity - invest_fixed, 0.0) if annuity > 0 else 0.0
+        cont401k = min(needed * 12, cap)
+        post_tax = needed - cont401k / 12
+        gf = float(guilt_free(cont401k)) - post_tax
+        if floor is None:
+            return plan(cont401k, post_tax, gf >= 0, "net_worth" if gf >= 0 else "income")
+        if gf >= floor:
+            return plan(cont401k, post_tax, True, "net_worth")
+
+    # maximise investing subject to guilt_free >= floor
+    points = _breakpoints(gross, cap, hsa_annual, healthcare_annual, rules)
+    gf = guilt_free(points)
+    feasible = target_net_worth is None
+    if gf[0] < floor:
+        return plan(0.0, 0.0, False, "income")
+    if gf[-1] >= floor:
+        return plan(cap, gf[-1] - floor, feasible, "guilt_free")
+
+    # gf is non-increasing: the root lies on the linear piece [k, k+1]
+    k = int(np.searchsorted(-gf, -floor, side="right")) - 1
+    x0, x1, y0, y1 = points[k], points[k + 1], gf[k], gf[k + 1]
+    cont401k = x0 + (y0 - floor) * (x1 - x0) / (y0 - y1)
+    return plan(cont401k, 0.0, feasible, "guilt_free")
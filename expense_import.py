@@ -0,0 +1,231 @@
+import csv
+import re
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from budget_map import CATEGORIES
+
+
+NOTE_MAX = 100  # same limit as the Add an expense form
+
+# bank category names (lowercase) -> CATEGORIES; matched exactly, then as substrings
+CATEGORY_ALIASES = {
+    "groceries": "Groceries", "grocery": "Groceries", "supermarket": "Groceries",
+    "food & drink": "Dining", "restaurants": "Dining", "restaurant": "Dining", "dining": "Dining",
+    "fast food": "Dining", "coffee": "Dining",
+    "gas": "Transportation", "fuel": "Transportation", "automotive": "Transportation",
+    "auto & transport": "Transportation", "parking": "Transportation", "rideshare": "Transportation",
+    "travel": "Travel", "airfare": "Travel", "hotel": "Travel", "lodging": "Travel",
+    "bills & utilities": "Utilities", "utilities": "Utilities", "internet": "Utilities", "mobile phone": "Utilities",
+    "rent": "Rent", "mortgage": "Rent",
+    "insurance": "Insurance",
+    "loan": "Debt", "credit card payment": "Debt", "student loan": "Debt",
+    "subscription": "Subscriptions", "streaming": "Subscriptions",
+    "health & wellness": "Health", "health": "Health", "pharmacy": "Health", "medical": "Health", "doctor": "Health",
+    "clothing": "Clothes", "apparel": "Clothes", "shopping": "Other",
+    "entertainment": "Entertainment", "movies": "Entertainment", "music": "Entertainment",
+    "gifts & donations": "Gifts", "gift": "Gifts", "charity": "Gifts",
+}
+
+# merchant keywords in the description, for exports without a category column (OFX)
+MERCHANT_KEYWORDS = {
+    "kroger": "Groceries", "meijer": "Groceries", "aldi": "Groceries", "whole foods": "Groceries",
+    "trader joe": "Groceries", "costco": "Groceries", "safeway": "Groceries", "publix": "Groceries",
+    "starbucks": "Dining", "mcdonald": "Dining", "chipotle": "Dining", "doordash": "Dining", "grubhub": "Dining",
+    "uber": "Transportation", "lyft": "Transportation", "shell": "Transportation", "exxon": "Transportation",
+    "chevron": "Transportation", "bp ": "Transportation", "speedway": "Transportation",
+    "delta air": "Travel", "united air": "Travel", "southwest": "Travel", "airbnb": "Travel", "marriott": "Travel",
+    "netflix": "Subscriptions", "spotify": "Subscriptions", "hulu": "Subscriptions", "disney+": "Subscriptions",
+    "amazon prime": "Subscriptions", "apple.com/bill": "Subscriptions",
+    "cvs": "Health", "walgreens": "Health",
+    "comcast": "Utilities", "xfinity": "Utilities", "consumers energy": "Utilities",
+    "verizon": "Utilities", "t-mobile": "Utilities", "at&t": "Utilities",
+    "geico": "Insurance", "state farm": "Insurance", "progressive": "Insurance",
+}
+
+_EXACT = {c.lower(): c for c in CATEGORIES}
+
+
+def map_category(raw: str = None, description: str = None) -> str:
+    """Maps a bank category (or, failing that, the description) onto CATEGORIES; unknown -> "Other"."""
+    return _map_category((raw or "").strip().lower(), (description or "").strip().lower())
+
+
+@lru_cache(maxsize=10_000)
+def _map_category(category: str, text: str) -> str:
+    # exports repeat the same few categories/merchants thousands of times
+    found = _EXACT.get(category) or CATEGORY_ALIASES.get(category)
+    if found is None and category:
+        found = next((v for k, v in CATEGORY_ALIASES.items() if k in category), None)
+    if found is None and text:
+        found = next((v for k, v in MERCHANT_KEYWORDS.items() if k in text), None)
+    return found or "Other"
+
+
+# -----------------------
+# Parsing
+# -----------------------
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d-%b-%Y", "%b %d, %Y")
+
+DATE_COLUMNS = ("date", "transaction date", "trans. date", "posted date", "posting date", "expense_date")
+AMOUNT_COLUMNS = ("amount", "transaction amount")
+DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals")
+NOTE_COLUMNS = ("description", "memo", "payee", "name", "notes", "note", "details")
+CATEGORY_COLUMNS = ("category", "transaction category")
+
+
+class BankExportError(ValueError):
+    """The file isn't a bank export we can read."""
+
+
+def _parse_date(value: str, formats: list) -> str:
+    value = value.strip()
+    for i, fmt in enumerate(formats):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if i:
+            # the format that worked goes first for the next row
+            formats.insert(0, formats.pop(i))
+        return parsed.date().isoformat()
+    raise ValueError(f"unrecognised date: {value!r}")
+
+
+def _parse_amount(value: str) -> float:
+    value = (value or "").strip().replace("$", "").replace(",", "")
+    if value.startswith("(") and value.endswith(")"):
+        value = "-" + value[1:-1]
+    return float(value) if value else 0.0
+
+
+def _column(fields: dict, names) -> str:
+    return next((fields[n] for n in names if n in fields), None)
+
+
+def _expense(expense_date, amount, note, category) -> dict:
+    note = (note or "").strip()[:NOTE_MAX]
+    return {
+        "expense_date": expense_date,
+        "amount": round(abs(amount), 2),
+        "category": map_category(category, note),
+        "Notes": note,
+    }
+
+
+def parse_csv(lines, expenses_are="auto"):
+    """
+    Yields expenses from a bank CSV export, one row at a time.
+
+    lines        : any iterable of text lines (an open file streams)
+    expenses_are : "negative", "positive" or "auto". With one signed amount column,
+                   "auto" treats negative amounts as spending when the file has any,
+                   and skips the other sign (payments, refunds). A separate debit
+                   column is always spending.
+    Raises BankExportError if the date/amount columns can't be found.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    fields = {h.strip().lower(): i for i, h in enumerate(header)}
+    date_i = _column(fields, DATE_COLUMNS)
+    amount_i = _column(fields, AMOUNT_COLUMNS)
+    debit_i = _column(fields, DEBIT_COLUMNS)
+    note_i = _column(fields, NOTE_COLUMNS)
+    category_i = _column(fields, CATEGORY_COLUMNS)
+    if date_i is None or (amount_i is None and debit_i is None):
+        raise BankExportError(f"need a date column and an amount (or debit) column, got {header}")
+
+    formats = list(DATE_FORMATS)
+    sign = {"negative": -1, "positive": 1}.get(expenses_are)
+    pending = []  # rows read before the sign is known, in "auto" mode
+
+    def cell(row, i):
+        return row[i] if i is not None and i < len(row) else ""
+
+    for row in reader:
+        if not row or not cell(row, date_i).strip():
+            continue
+        if debit_i is not None:
+            amount = _parse_amount(cell(row, debit_i))
+            if not amount:
+                continue
+        else:
+            amount = _parse_amount(cell(row, amount_i))
+            if not amount:
+                continue
+            if sign is None:
+                if amount < 0:
+                    # spending is negative: the positive rows held so far were payments/refunds
+                    sign = -1
+                    pending = None
+                else:
+                    pending.append((_parse_date(cell(row, date_i), formats), amount, cell(row, note_i), cell(row, category_i)))
+                    continue
+            if (amount < 0) != (sign < 0):
+                continue
+        yield _expense(_parse_date(cell(row, date_i), formats), amount, cell(row, note_i), cell(row, category_i))
+
+    # never saw a negative amount: everything was spending
+    if sign is None and pending:
+        yield from (_expense(*p) for p in pending)
+
+
+_OFX_TAG = re.compile(r"<(/?[A-Za-z0-9.]+)>([^<]*)")
+
+def parse_ofx(lines):
+    """
+    Yields debits from an OFX/QFX statement (SGML 1.x or XML 2.x), one STMTTRN at a time.
+    """
+    txn = None
+    for line in lines:
+        for tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                txn = {}
+            elif tag == "/STMTTRN":
+                if txn is not None:
+                    amount = _parse_amount(txn.get("TRNAMT"))
+                    posted = txn.get("DTPOSTED", "")[:8]
+                    if amount < 0 and len(posted) == 8:
+                        note = txn.get("NAME") or txn.get("MEMO") or txn.get("PAYEE") or ""
+                        yield _expense(f"{posted[:4]}-{posted[4:6]}-{posted[6:8]}", amount, note, None)
+                txn = None
+            elif txn is not None and not tag.startswith("/"):
+                txn[tag] = value.strip()
+
+
+def parse_bank_export(lines, filename: str = "", expenses_are="auto"):
+    """Picks the parser from the file name (.ofx / .qfx, else CSV)."""
+    if filename.lower().endswith((".ofx", ".qfx")):
+        return parse_ofx(lines)
+    return parse_csv(lines, expenses_are=expenses_are)
+
+
+# -----------------------
+# Dedupe
+# -----------------------
+def dedupe_key(row: dict) -> tuple:
+    return (str(row["expense_date"])[:10], round(float(row.get("amount") or 0.0), 2), (row.get("Notes") or "").strip())
+
+
+def new_expenses(incoming, existing):
+    """
+    Drops incoming rows already present in `existing`, by (date, amount, note).
+
+    Matching is one-for-one: two identical coffees on the same day in the file
+    against one already saved imports one. Re-importing a file is a no-op.
+    Returns (new_rows, skipped_count).
+    """
+    seen = Counter(dedupe_key(r) for r in existing)
+    fresh, skipped = [], 0
+    for row in incoming:
+        key = dedupe_key(row)
+        if seen[key] > 0:
+            seen[key] -= 1
+            skipped += 1
+        else:
+            fresh.append(row)
+    return fresh, skipped
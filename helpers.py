@@ -1,12 +1,31 @@
 import streamlit as st
-from supabase import create_client, Client
+from supabase_auth.errors import AuthApiError, AuthInvalidJwtError
+from supabase_pool import ClientPool, jwt_claims
+from repository import Repository, SupabaseRepository, SqliteRepository, PAGE_SIZE
+from user_cache import UserCache
+from ledger import LedgerStore
+from write_queue import ExpenseWriteQueue, is_pending
+from monte_carlo import simulate_net_worth, load_annual_returns
+from projection import projection_arrays
+from income_calc import income_c_array, TAX_REGISTRY
+from expense_import import new_expenses, parse_bank_export
+import timing
+from timing import span, timed, miss
+from budget_engine import budget_vs_actual
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
+import matplotlib.dates as mdates
 import base64
 import io
 import html as _html
+import numpy as np
 import pandas as pd
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 
 # -----------------------
@@ -35,70 +54,89 @@ def print_row(label, monthly, income=None):
 		return f"{label:<35} {monthly:>12,.2f}   {yearly:>12,.2f}   {pct:>7.2f}%"
 	return f"{label:<35} {monthly:>12,.2f}   {yearly:>12,.2f}"
 
-def fintech_bar(label, actual, budget, breakdown=None):
+BAR_GRAY, BAR_GREEN, BAR_AMBER, BAR_RED = "#9CA3AF", "#16A34A", "#F59E0B", "#DC2626"
+
+def budget_bars_frame(labels, actuals, budgets) -> pd.DataFrame:
     """
-    Renders a fintech-style progress bar with color thresholds and overspend info.
+    Ratio, colors and status text for a set of budget bars, computed in one pass.
     """
-    # Guard
-    actual = float(actual or 0.0)
-    budget = float(budget or 0.0)
-
-    ratio = (actual / budget) if budget > 0 else 0.0
-    pct = ratio * 100.0
-    fill = min(pct, 100.0)
-
-    amount_over_budget = actual - budget
-
-    # Color rules
-    if budget <= 0:
-        color = "#9CA3AF"  # gray
-    elif pct < 80:
-        color = "#16A34A"  # green
-    elif pct < 100:
-        color = "#F59E0B"  # amber
-    else:
-        color = "#DC2626"  # red
-
-    # Text: remaining vs over
-    if budget > 0:
-        delta = budget - actual
-        status = f"Remaining: ${delta:,.0f}" if delta >= 0 else f"Over by: ${abs(delta):,.0f}"
-        pct_text = f"{pct:,.0f}%"
-    else:
-        status = "No budget set"
-        pct_text = "—"
-
-    st.markdown(
-        f"""
-        <div style="margin: 10px 0 6px 0;">
-          <div style="display:flex; justify-content:space-between; align-items:baseline;">
-            <div style="font-weight:700; font-size: 1.0rem;">{label}</div>
-            <div style="font-size:0.9rem; color:#6B7280;">{pct_text}</div>
-          </div>
-
-          <div style="display:flex; justify-content:space-between; margin-top:2px;">
-            <div style="font-size:0.95rem;">${actual:,.0f} / ${budget:,.0f}</div>
-            <div style="font-size:0.95rem; color:{'#DC2626' if (budget>0 and actual>budget) else '#16A34A' if (budget>0 and actual<=budget) else '#6B7280'};">
-              {status}
-            </div>
-          </div>
-
-          <div style="height: 10px; background: #E5E7EB; border-radius: 999px; overflow:hidden; margin-top: 6px;">
-            <div style="width:{fill:.1f}%; height:100%; background:{color}; border-radius: 999px;"></div>
-          </div>
-        </div>
-        """,
-        unsafe_allow_html=True
+    actual = np.nan_to_num(np.asarray(actuals, dtype=float))
+    budget = np.nan_to_num(np.asarray(budgets, dtype=float))
+    has_budget = budget > 0
+    over = actual > budget
+
+    pct = 100.0 * np.divide(actual, budget, out=np.zeros_like(actual), where=has_budget)
+    color = np.select([~has_budget, pct < 80, pct < 100], [BAR_GRAY, BAR_GREEN, BAR_AMBER], BAR_RED)
+    status_color = np.select([~has_budget, over], ["#6B7280", BAR_RED], BAR_GREEN)
+
+    delta = budget - actual
+    status = np.where(
+        ~has_budget, "No budget set",
+        np.where(delta >= 0, [f"Remaining: ${d:,.0f}" for d in delta], [f"Over by: ${-d:,.0f}" for d in delta]),
+    )
+    pct_text = np.where(has_budget, [f"{p:,.0f}%" for p in pct], "—")
+
+    return pd.DataFrame({
+        "label": list(labels),
+        "actual": actual,
+        "budget": budget,
+        "pct": pct,
+        "fill": np.minimum(pct, 100.0),
+        "color": color,
+        "status": status,
+        "status_color": status_color,
+        "pct_text": pct_text,
+        "over_by": np.where(over & has_budget, actual - budget, 0.0),
+        "from_guilt_free": np.where(over, actual - budget, 0.0),
+    })
+
+
+def _warning_html(text):
+    return (
+        '<div style="margin:6px 0 4px 0; padding:10px 14px; border-radius:8px; '
+        'background:rgba(255,189,69,0.16); color:#926C05; font-size:0.95rem;">'
+        f"{_html.escape(text)}</div>"
     )
 
-    if breakdown:
-        st.caption(breakdown)
 
-    # Optional warning callout
-    if actual > budget:
-        if budget > 0:
-            st.warning(f"{label} is over budget by ${actual - budget:,.2f}", icon="⚠️")
-        st.warning(f"${actual-budget:,.0f} taken from guilt-free spending")
+def budget_bars_html(frame: pd.DataFrame, breakdowns=None) -> str:
+    """
+    One HTML block for every bar in `frame`, with the over-budget warnings inline.
+    breakdowns: optional {label: caption text}.
+    """
+    breakdowns = breakdowns or {}
+    parts = []
+    for row in frame.itertuples(index=False):
+        parts.append(
+            '<div style="margin: 10px 0 6px 0;">'
+            '<div style="display:flex; justify-content:space-between; align-items:baseline;">'
+            f'<div style="font-weight:700; font-size: 1.0rem;">{_html.escape(row.label)}</div>'
+            f'<div style="font-size:0.9rem; color:#6B7280;">{row.pct_text}</div>'
+            '</div>'
+            '<div style="display:flex; justify-content:space-between; margin-top:2px;">'
+            f'<div style="font-size:0.95rem;">${row.actual:,.0f} / ${row.budget:,.0f}</div>'
+            f'<div style="font-size:0.95rem; color:{row.status_color};">{row.status}</div>'
+            '</div>'
+            '<div style="height: 10px; background: #E5E7EB; border-radius: 999px; overflow:hidden; margin-top: 6px;">'
+            f'<div style="width:{row.fill:.1f}%; height:100%; background:{row.color}; border-radius: 999px;"></div>'
+            '</div>'
+            '</div>'
+        )
+        breakdown = breakdowns.get(row.label)
+        if breakdown:
+            parts.append(f'<div style="font-size:0.875rem; color:#6B7280;">{_html.escape(breakdown)}</div>')
+        if row.over_by > 0:
+            parts.append(_warning_html(f"⚠️ {row.label} is over budget by ${row.over_by:,.2f}"))
+        if row.from_guilt_free > 0:
+            parts.append(_warning_html(f"${row.from_guilt_free:,.0f} taken from guilt-free spending"))
+    return "".join(parts)
+
+
+@timed("budget_bars")
+def render_budget_bars(labels, actuals, budgets, breakdowns=None):
+    """Renders all the bars as a single st.markdown element."""
+    st.markdown(budget_bars_html(budget_bars_frame(labels, actuals, budgets), breakdowns), unsafe_allow_html=True)
+
 
 def fixed_costs(rent=0, utilities=0, insurance=0, trans_travel=0, debt=0, food=0, clothes=0, phone=0, subs=0):
 	fixed = rent + utilities + insurance + trans_travel + debt + food + clothes + phone + subs
@@ -156,34 +194,7 @@ def savings(emergency=0, vacations=0, gifts=0, other=0):
 	return save, "\n".join(lines)
 
 
-def projection_series_with_savings(pv, monthly_invest, monthly_savings, years, annual_returns=(0.05, 0.07, 0.09)):
-	n = int(years * 12)
-	t_years = [m / 12 for m in range(n + 1)]
-
-	contrib_invest = [monthly_invest * m for m in range(n + 1)]
-	savings_series = [monthly_savings * m for m in range(n + 1)]
-
-	fv_map = {}
-	for r in annual_returns:
-		r_m = (1 + r) ** (1 / 12) - 1
-		series = []
-		for m in range(n + 1):
-			if m == 0:
-				series.append(pv)
-				continue
-
-			if abs(r_m) < 1e-12:
-				fv_invest = pv + monthly_invest * m
-			else:
-				fv_invest = pv * (1 + r_m) ** m + monthly_invest * (((1 + r_m) ** m - 1) / r_m)
-
-			series.append(fv_invest + savings_series[m])
-
-		fv_map[r] = series
-
-	return t_years, contrib_invest, savings_series, fv_map
-
-
+@timed("fig.pie")
 def make_pie_fig(income, fixed, post_tax, save, guilt_free, pretax_401k, pretax_hsa):
 	overall_labels = ["Fixed Costs", "Post-Tax Investments", "Savings", "Guilt-Free Spending"]
 	overall_values = [fixed, post_tax, save, guilt_free]
@@ -218,12 +229,13 @@ def make_pie_fig(income, fixed, post_tax, save, guilt_free, pretax_401k, pretax_
 	return fig
 
 
+@timed("fig.projection")
 def make_projection_fig(t_years, contrib_invest, savings_series, fv_map):
 	fig2 = plt.figure(figsize=(12, 6))
 	ax2 = fig2.add_subplot(1, 1, 1)
 
 	# Total contributions line (invest + savings)
-	total_contrib = [a + b for a, b in zip(contrib_invest, savings_series)]
+	total_contrib = np.asarray(contrib_invest) + np.asarray(savings_series)
 
 	ax2.plot(t_years, total_contrib, label="Total Contributions (Invest+Savings)")
 	ax2.plot(t_years, fv_map[0.05], label="Net Worth @ 5%")
@@ -244,7 +256,7 @@ def make_projection_fig(t_years, contrib_invest, savings_series, fv_map):
 	def label_line(ax, x, y, text, x_pos=0.92):
 		x_min, x_max = ax.get_xlim()
 		x_target = x_min + x_pos * (x_max - x_min)
-		idx = min(range(len(x)), key=lambda i: abs(x[i] - x_target))
+		idx = int(np.argmin(np.abs(np.asarray(x) - x_target)))
 		ax.text(x[idx], y[idx], f"  {text}", va="center")
 
 	label_line(ax2, t_years, total_contrib, "Total Contributions")
@@ -255,6 +267,56 @@ def make_projection_fig(t_years, contrib_invest, savings_series, fv_map):
 	return fig2
 
 
+@timed("fig.monte_carlo")
+def make_monte_carlo_fig(t_years, total_contrib, bands, n_paths, percentiles=(10, 50, 90)):
+	low, mid, high = bands
+
+	fig = plt.figure(figsize=(12, 6))
+	ax = fig.add_subplot(1, 1, 1)
+
+	ax.plot(t_years, total_contrib, label="Total Contributions (Invest+Savings)")
+	ax.fill_between(t_years, low, high, alpha=0.2, label=f"Net Worth P{percentiles[0]}–P{percentiles[2]}")
+	ax.plot(t_years, mid, label=f"Net Worth P{percentiles[1]} (median)")
+	ax.plot(t_years, low, linewidth=0.8, alpha=0.6)
+	ax.plot(t_years, high, linewidth=0.8, alpha=0.6)
+
+	ax.set_title(f"Monte Carlo Net Worth Projection ({n_paths:,} paths)")
+	ax.set_xlabel("Years")
+	ax.set_ylabel("Dollars")
+	ax.grid(True, alpha=0.3)
+	ax.legend(loc="upper left")
+
+	ax.ticklabel_format(style="plain", axis="y")
+	ax.yaxis.set_major_formatter(mtick.StrMethodFormatter("${x:,.0f}"))
+
+	return fig
+
+
+@timed("fig.contribution")
+def make_contribution_fig(cont401k, weekly_guilt_free, monthly_401k, current_401k, current_weekly):
+	fig, ax = plt.subplots(figsize=(12, 5))
+
+	ax.plot(cont401k, weekly_guilt_free, label="Weekly Guilt-Free Spending")
+	ax.axvline(current_401k, color="gray", linestyle="--", linewidth=1)
+	ax.plot([current_401k], [current_weekly], "o", color="black")
+	ax.annotate(f"  now: ${current_weekly:,.0f}/wk", (current_401k, current_weekly), va="bottom")
+	ax.set_xlabel("Your annual 401K contribution")
+	ax.set_ylabel("Weekly guilt-free spending")
+	ax.xaxis.set_major_formatter(mtick.StrMethodFormatter("${x:,.0f}"))
+	ax.yaxis.set_major_formatter(mtick.StrMethodFormatter("${x:,.0f}"))
+	ax.grid(True, alpha=0.3)
+
+	ax2 = ax.twinx()
+	ax2.plot(cont401k, monthly_401k, color="tab:green", label="Monthly into 401K (incl. match)")
+	ax2.set_ylabel("Monthly into 401K")
+	ax2.yaxis.set_major_formatter(mtick.StrMethodFormatter("${x:,.0f}"))
+
+	lines = ax.get_lines()[:1] + ax2.get_lines()
+	ax.legend(lines, [l.get_label() for l in lines], loc="upper center")
+	ax.set_title("What if my 401K contribution were...")
+	return fig
+
+
 def make_budget_text(income, fixed_block, post_block, savings_block, fixed, post_tax, save, guilt_free, pretax_401k, pretax_hsa):
 	lines = []
 	lines.append("\nBUDGET SUMMARY")
@@ -320,6 +382,7 @@ def progress_bar(value, max_value):
       </div>
     """
 
+@timed("budget_html")
 def make_budget_html(
     timestamp,
     income,
@@ -357,6 +420,14 @@ def make_budget_html(
     post_pre    = _html.escape(post_block_text or "").strip()
     savings_pre = _html.escape(savings_block_text or "").strip()
 
+    # charts are embedded as data URIs so the downloaded file stands alone
+    charts = "".join(
+        f'<img src="data:image/png;base64,{b64}" alt="{alt}" />'
+        for b64, alt in ((pie_b64, "Budget breakdown"), (proj_b64, "Net worth projection"))
+        if b64
+    )
+    charts_html = f'<div class="section twocol">{charts}</div>' if charts else ""
+
     return f"""<!doctype html>
 <html>
 <head>
@@ -465,149 +536,494 @@ def make_budget_html(
       {progress_bar(guilt_free, income)}
     </div>
 
- 
+    {charts_html}
 
   </div>
 </body>
 </html>
 """
 
-def fig_to_png_bytes(fig):
+@timed("fig.expense")
+def make_expense_fig(cats, amounts, title, months, month_totals):
+	fig_s, ax_s = plt.subplots(1, 2, figsize=(14, 7))
+
+	ax_s[0].barh(cats, amounts)
+	ax_s[0].set_title(title, fontsize=12, pad=20)
+	ax_s[0].set_xlabel('Amount spent ($)')
+	for i, v in enumerate(amounts):
+		ax_s[0].text(v, i, f" ${v:,.0f}", va="center")
+
+	ax_s[1].bar(pd.to_datetime(list(months)), month_totals)
+	ax_s[1].set_title("Total Spending per month")
+	ax_s[1].set_xlabel('Month')
+	ax_s[1].set_ylabel('Spending ($)')
+	ax_s[1].xaxis.set_major_locator(mdates.MonthLocator())
+	ax_s[1].xaxis.set_major_formatter(mdates.DateFormatter("%m/%y"))
+
+	plt.setp(ax_s[1].get_xticklabels(), rotation=45, ha="right")
+	plt.setp(ax_s[0].get_xticklabels(), rotation=45, ha="right")
+
+	return fig_s
+
+
+def fig_to_png_bytes(fig, dpi=None):
 	buf = io.BytesIO()
-	fig.savefig(buf, format="png", bbox_inches="tight")
+	fig.savefig(buf, format="png", bbox_inches="tight", dpi=dpi)
 	buf.seek(0)
 	return buf.read()
 
 
-def fig_to_base64_png(fig):
-	return base64.b64encode(fig_to_png_bytes(fig)).decode("utf-8")
+def png_to_base64(png):
+	return base64.b64encode(png).decode("utf-8")
+
+
+# -----------------------
+# Tax rules
+# -----------------------
+FILING_STATUS_LABELS = {"single": "Single", "married_joint": "Married filing jointly", "head_of_household": "Head of household"}
+
+def tax_rules_for(year, filing_status, state):
+	# a dict lookup into the registry parsed at import
+	return TAX_REGISTRY.rules(year, filing_status, state)
+
+
+# -----------------------
+# Rendered chart cache
+# -----------------------
+# Charts are cached as encoded PNG bytes keyed by their numeric inputs, so a rerun
+# that doesn't change them (any unrelated widget) skips matplotlib entirely.
+# st.cache_data hashes the arguments and evicts least-recently-used entries past max_entries.
+CHART_DPI = 200  # same as st.pyplot
+
+@timed("png_encode")
+def render_png(fig):
+	png = fig_to_png_bytes(fig, dpi=CHART_DPI)
+	plt.close(fig)
+	return png
+
+@timed("chart.pie", cached=True)
+@st.cache_data(max_entries=64, show_spinner=False)
+def pie_png(income, fixed, post_tax, save, guilt_free, pretax_401k, pretax_hsa) -> bytes:
+	miss()
+	return render_png(make_pie_fig(income, fixed, post_tax, save, guilt_free, pretax_401k, pretax_hsa))
+
+@timed("chart.projection", cached=True)
+@st.cache_data(max_entries=64, show_spinner=False)
+def projection_png(pv, monthly_invest, monthly_savings, years, annual_returns=(0.05, 0.07, 0.09)) -> bytes:
+	miss()
+	with span("projection"):
+		t_years, contrib_invest, savings_series, fv = projection_arrays(pv, monthly_invest, monthly_savings, years, annual_returns)
+	fv_map = dict(zip(annual_returns, fv))
+	return render_png(make_projection_fig(t_years, contrib_invest, savings_series, fv_map))
+
+@timed("chart.expense", cached=True)
+@st.cache_data(max_entries=64, show_spinner=False)
+def expense_png(cats: tuple, amounts: tuple, title: str, months: tuple, month_totals: tuple) -> bytes:
+	miss()
+	return render_png(make_expense_fig(cats, amounts, title, months, month_totals))
+
+@timed("chart.contribution", cached=True)
+@st.cache_data(max_entries=64, show_spinner=False)
+def contribution_curve_png(annual_salary, match_rate, hsa_monthly, healthcare_premium, other_monthly, outflows, current_401k, rules_key, n_points=2000) -> bytes:
+	"""
+	Weekly guilt-free spending and monthly 401K across n_points contribution levels,
+	from 0 to the deferral limit (or salary), in one income_c_array pass.
+	rules_key is (tax year, filing status, state), see tax_rules_for.
+	"""
+	miss()
+	rules = tax_rules_for(*rules_key)
+	top = min(max(rules.federal.limit_401k, current_401k), annual_salary) if annual_salary > 0 else 0.0
+	cont401k = np.linspace(0.0, top, n_points)
+	monthly_income, monthly_401k, _ = income_c_array(annual_salary, cont401k, match_rate, hsa_monthly, healthcare_premium, rules=rules)
+	weekly = (monthly_income + other_monthly - outflows) / 4
+
+	now_income, _, _ = income_c_array(annual_salary, current_401k, match_rate, hsa_monthly, healthcare_premium, rules=rules)
+	current_weekly = float((now_income + other_monthly - outflows) / 4)
+	return render_png(make_contribution_fig(cont401k, weekly, monthly_401k, current_401k, current_weekly))
+
+@st.cache_resource
+def historical_returns():
+	return load_annual_returns()
+
+@timed("chart.monte_carlo", cached=True)
+@st.cache_data(max_entries=16, show_spinner=False)
+def monte_carlo_png(pv, monthly_invest, monthly_savings, years, n_paths, mean, vol, use_historical, seed) -> bytes:
+	miss()
+	t_years, bands = simulate_net_worth(
+		pv, monthly_invest, monthly_savings, years,
+		n_paths=n_paths, mean=mean, vol=vol,
+		historical=historical_returns() if use_historical else None,
+		seed=seed,
+	)
+	total_contrib = (monthly_invest + monthly_savings) * 12.0 * t_years
+	return render_png(make_monte_carlo_fig(t_years, total_contrib, bands, n_paths))
+
+def show_png(png: bytes):
+	with span("st.image"):
+		st.image(png, width="stretch")
+
+
+# -----------------------
+# Timings (debug)
+# -----------------------
+def timings_panel(rerun_started: float):
+	"""Hidden unless BUDGET_TIMINGS=1: records this rerun and shows the session's span histograms in the sidebar."""
+	if not timing.ENABLED:
+		return
+	timings = timing.session_timings()
+	timings.observe("rerun", None, time.perf_counter() - rerun_started)
+	timings.reruns += 1
+	labels = {"session": get_script_run_ctx().session_id[:8]}
+	with st.sidebar.expander("Timings (debug)"):
+		st.caption(f"{timings.reruns} reruns this session")
+		st.dataframe(pd.DataFrame(timings.rows()), hide_index=True)
+		# process-wide, unlike the spans: every read that went past the caches, by table
+		with _counter_lock:
+			queries = dict(get_query_counter())
+		st.caption(f"{sum(queries.values())} network reads since the server started (all sessions)")
+		if queries:
+			st.dataframe(pd.DataFrame({"query": list(queries), "count": list(queries.values())}), hide_index=True)
+		ledgers = get_ledger_store().stats()
+		st.caption(
+			f"Cached ledgers: {ledgers['users']}, {ledgers['rows']:,} rows (~{ledgers['bytes'] / 2**20:.1f} MB), "
+			f"{ledgers['hit_rate']:.0%} hits, {ledgers['evictions']} evictions"
+		)
+		c1, c2, c3 = st.columns(3)
+		c1.download_button("OpenMetrics", timings.openmetrics(labels), "timings.txt", "text/plain", key="timings_openmetrics")
+		c2.download_button("JSON lines", timings.json_lines(labels), "timings.jsonl", "application/jsonl", key="timings_jsonl")
+		if c3.button("Reset", key="timings_reset"):
+			st.session_state[timing.SESSION_KEY] = timing.Timings()
 
 
 # -----------------------
 # Supabase UI
 # -----------------------
-#@st.cache_resource
+# --- Per-user client pool (resource cache, shared by all sessions) ---
+@st.cache_resource
+def get_client_pool() -> ClientPool:
+    # with the project's JWT secret, tokens new to the pool are verified without a round trip
+    return ClientPool(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"], jwt_secret=st.secrets.get("SUPABASE_JWT_SECRET"))
+
+def _remember_tokens(entry):
+    # the pool may have refreshed (and rotated) the tokens for us
+    st.session_state["sb_access_token"] = entry.access_token
+    st.session_state["sb_refresh_token"] = entry.refresh_token
+
+def _drop_tokens():
+	for key in ("sb_access_token", "sb_refresh_token"):
+		st.session_state.pop(key, None)
+
+@timed("auth")
 def init_connection():
-	url = st.secrets["SUPABASE_URL"]
-	key = st.secrets["SUPABASE_KEY"]
+	at = st.session_state.get("sb_access_token")
+	rt = st.session_state.get("sb_refresh_token")
+	if at and rt:
+		# no network unless the token is new to the pool or about to expire
+		try:
+			entry = get_client_pool().acquire(at, rt)
+		except (AuthApiError, AuthInvalidJwtError, PermissionError, ValueError):
+			# revoked / expired beyond refresh / malformed / not this user's: back to the login form.
+			# Network errors propagate, so a blip doesn't log the user out.
+			_drop_tokens()
+		else:
+			_remember_tokens(entry)
+			return entry.client
+
+	# Logged out: a private client per browser session, so a login never leaks into another session
 	if "supabase_client" not in st.session_state:
-		st.session_state["supabase_client"] = create_client(url,key)
+		st.session_state["supabase_client"] = get_client_pool().new_client()
 	return st.session_state["supabase_client"]
 
+def client_for(user_id: str):
+    entry = get_client_pool().get(user_id) if user_id else None
+    return entry.client if entry is not None else init_connection()
+
+@st.cache_resource
+def get_repository() -> Repository:
+    """Where budget_profile / expense_profile live: SQLite if SQLITE_PATH is set in secrets, else Supabase."""
+    path = st.secrets.get("SQLITE_PATH")
+    if path:
+        return SqliteRepository(path)
+    return SupabaseRepository(client_for)
+
 
 def set_session(session):
+    # just issued by the auth server, so the pool can trust it without verifying
+    get_client_pool().adopt(session)
     st.session_state["sb_access_token"] = session.access_token
     st.session_state["sb_refresh_token"] = session.refresh_token
 
 def clear_session():
     st.session_state.clear()
 
-def restore_session(supabase):
-	at = st.session_state.get("sb_access_token")
-	rt = st.session_state.get("sb_refresh_token")
-	if at and rt:
-	    # refreshes if needed
-	    supabase.auth.set_session(at, rt)
-	    return True
-	return False
-
-def load_profile_data(supabase, user_id: str) -> dict:
-    restore_session(supabase)
-    res = (
-        supabase.table("budget_profile")
-        .select("data")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    # data is JSONB in DB -> comes back as a Python dict or None
-    return res.data.get("data") if res.data and res.data.get("data") else {}
+def current_user():
+    """(user_id, email) of the signed-in user, or (None, None). Read from the pool, no network."""
+    at = st.session_state.get("sb_access_token")
+    entry = get_client_pool().get(jwt_claims(at).get("sub")) if at else None
+    if entry is None or entry.access_token != at:
+        return None, None
+    return entry.user_id, entry.email
 
-def save_profile_data(supabase, user_id: str, data: dict):
-    restore_session(supabase)
-    return (
-        supabase.table("budget_profile")
-        .update({"data": data})
-        .eq("id", user_id)
-        .execute()
-    )
+def sign_out(user_id: str):
+    # revokes the refresh tokens and drops the pooled client
+    get_client_pool().sign_out(user_id)
+
+def save_profile_data(user_id: str, data: dict):
+    return get_repository().save_profile_data(user_id, data)
+
+def save_display_name(user_id: str, display_name: str):
+    return get_repository().set_display_name(user_id, display_name)
+
+
+# --- Network read counter (cache hits never reach count_query) ---
+_counter_lock = threading.Lock()
 
-# --- Cache the Supabase client (resource cache) ---
 @st.cache_resource
-def get_supabase_client():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
+def get_query_counter() -> Counter:
+    return Counter()
 
-def init_connection():
-    # keep your app.py call sites unchanged
-    return get_supabase_client()
+def count_query(name: str):
+    with _counter_lock:
+        get_query_counter()[name] += 1
+
+
+# --- Per-user query cache (resource cache, shared by all sessions) ---
+@st.cache_resource
+def get_user_cache() -> UserCache:
+    # bounded so long-running instances stay flat as users pile up
+    return UserCache(max_entries=2000, max_bytes=64 * 1024 * 1024)
 
 
-# --- Cached READS (data cache) ---
-@st.cache_data(ttl=60)
+# --- Cached READS (per-user cache) ---
+def _load_budget_profile(user_id: str) -> dict:
+    miss()
+    count_query("budget_profile")
+    return get_repository().get_profile(user_id)
+
+@timed("fetch.profile", cached=True)
 def fetch_budget_profile(user_id: str) -> dict:
-    sb = get_supabase_client()
-    restore_session(sb)
-    res = (
-        sb.table("budget_profile")
-        .select("data, display_name")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    return res.data or {}
-
-@st.cache_data(ttl=30)
-def fetch_expenses_month(user_id: str, start_iso: str, end_iso: str) -> pd.DataFrame:
-    sb = get_supabase_client()
-    restore_session(sb)
-    res = (
-        sb.table("expense_profile")
-        .select("expense_date, category, amount")
-        .eq("id", user_id)
-        .gte("expense_date", start_iso)
-        .lte("expense_date", end_iso)
-        .execute()
-    )
-    rows = res.data or []
-    df = pd.DataFrame(rows) if rows else pd.DataFrame(columns=["expense_date", "category", "amount"])
-    if not df.empty:
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
-    return df
-
-@st.cache_data(ttl=30)
-def fetch_expenses_range(user_id: str, start_iso: str, end_iso: str) -> list:
-    sb = get_supabase_client()
-    restore_session(sb)
-    res = (
-        sb.table("expense_profile")
-        .select("id, expense_id, expense_date, category, amount, created_at, Notes")
-        .eq("id", user_id)
-        .gte("expense_date", start_iso)
-        .lte("expense_date", end_iso)
-        .order("expense_date", desc=True)
-        .execute()
+    return get_user_cache().get_or_load(
+        user_id, ("profile",), lambda: _load_budget_profile(user_id), ttl=60
     )
-    return res.data or []
 
-@st.cache_data(ttl=120)
-def fetch_monthly_expense_totals() -> pd.DataFrame:
-    sb = get_supabase_client()
-    restore_session(sb)
-    monthly = sb.rpc("monthly_expense_totals", {"start_date": None, "end_date": None}).execute()
-    dfm = pd.DataFrame(monthly.data)
-    if not dfm.empty:
-        dfm["month"] = pd.to_datetime(dfm["month"])
-        dfm["total"] = dfm["total"].astype(float)
-    return dfm
+
+# --- Per-user expense ledgers (resource cache, shared by all sessions) ---
+@st.cache_resource
+def get_ledger_store() -> LedgerStore:
+    # ~256k rows across all users at ROW_BYTES each
+    return LedgerStore(max_users=256, max_bytes=256 * 1024 * 1024, refresh_after=30, full_reload_after=600)
+
+def _load_expense_rows(user_id: str, since: str = None) -> list:
+    """
+    All of a user's expenses, or only those created after `since`.
+    Pages are keyset on (created_at, expense_id), so each page is an index
+    range scan rather than an ever-growing OFFSET.
+    """
+    miss()
+    repo = get_repository()
+    rows = []
+    while True:
+        count_query("expense_profile")
+        after = (rows[-1]["created_at"], rows[-1]["expense_id"]) if rows else None
+        page = repo.expense_page(user_id, since=since, after=after, limit=PAGE_SIZE)
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+
+@timed("fetch.ledger", cached=True)
+def get_expense_ledger(user_id: str):
+    return get_ledger_store().get(user_id, _load_expense_rows)
+
+@timed("fetch.expenses_page", cached=True)
+def fetch_expenses_page(user_id: str, start_iso: str, end_iso: str, limit: int, before: tuple = None):
+    """
+    (rows newest first, cursor for the next older page or None); see ExpenseLedger.page.
+    Cut from the in-memory ledger: what crosses the network is the ledger's own load
+    (the whole history on a full load, then only rows created since), not one page.
+    """
+    return get_expense_ledger(user_id).page(start_iso, end_iso, limit, before)
+
+@timed("fetch.expense_count", cached=True)
+def fetch_expense_count(user_id: str, start_iso: str, end_iso: str) -> int:
+    return get_expense_ledger(user_id).count(start_iso, end_iso)
+
+@timed("fetch.category_totals", cached=True)
+def fetch_category_totals(user_id: str, start_iso: str, end_iso: str) -> dict:
+    return get_expense_ledger(user_id).category_totals(start_iso, end_iso)
+
+
+@timed("fetch.budget_history", cached=True)
+def fetch_budget_history(user_id: str, budgets, start_month: str = None, end_month: str = None) -> pd.DataFrame:
+    """Budget vs actual per (month, bucket) from the ledger's month/category totals; see budget_vs_actual."""
+    return budget_vs_actual(*get_expense_ledger(user_id).month_category_totals(start_month, end_month), budgets)
+
+# --- Concurrent data loading (one stage per rerun) ---
+@st.cache_resource
+def get_fetch_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="fetch")
+
+@timed("load_user_data")
+def load_user_data(user_id: str, month_start_iso: str, month_end_iso: str) -> dict:
+    """
+    Runs every read a rerun needs at the same time, so a cold rerun costs ~one round-trip instead of one per query.
+    Returns {"profile", "month", "monthly_totals", "ledger"}; the expense table pages from the ledger.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(fn, *args):
+        # worker threads need the script context to use st.session_state
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    # profile and the expense ledger are the only things that can need the network
+    jobs = {
+        "profile": (fetch_budget_profile, user_id),
+        "ledger": (get_expense_ledger, user_id),
+    }
+    executor = get_fetch_executor()
+    futures = {name: executor.submit(run, *job) for name, job in jobs.items()}
+    ledger = futures["ledger"].result()
+    return {
+        "profile": futures["profile"].result(),
+        "month": ledger.frame(month_start_iso, month_end_iso),
+        "monthly_totals": ledger.monthly_totals(),
+        "ledger": ledger,
+    }
 
 
 # --- Cache invalidation helpers (call after writes) ---
-def clear_profile_cache():
-    fetch_budget_profile.clear()
+def clear_profile_cache(user_id: str = None):
+    if user_id:
+        get_user_cache().invalidate(user_id, kinds=("profile",))
+    else:
+        get_user_cache().clear()
+
+def clear_expense_cache(user_id: str = None):
+    """Drops a user's ledger (or every ledger); the next read reloads it in full."""
+    if user_id:
+        get_ledger_store().discard(user_id)
+    else:
+        get_ledger_store().clear()
+
+def record_expenses(user_id: str, rows):
+    """After an insert: merge the rows the server returned (with their expense_id) into the cached ledger."""
+    ledger = get_ledger_store().peek(user_id)
+    if ledger is not None:
+        ledger.merge(rows, advance=False)
+
+IMPORT_CHUNK = 500  # rows per bulk insert request
 
-def clear_expense_cache():
-    fetch_expenses_month.clear()
-    fetch_expenses_range.clear()
-    fetch_monthly_expense_totals.clear()
+@st.cache_data(max_entries=4, show_spinner=False)
+def parse_upload(data: bytes, filename: str, expenses_are: str = "auto") -> list:
+    """Parsed rows of an uploaded bank export, cached so reruns don't re-parse it."""
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace", newline="")
+    return list(parse_bank_export(lines, filename, expenses_are=expenses_are))
+
+def import_expenses(user_id: str, rows, chunk_size: int = IMPORT_CHUNK) -> dict:
+    """
+    Bulk import of parsed bank rows (see expense_import): drops rows already saved,
+    by (date, amount, note), inserts the rest chunk_size rows per request and
+    merges what was saved into the cached ledger once at the end. If a chunk
+    fails, the chunks before it are still merged, so a retry dedupes against them.
+    Returns {"inserted", "skipped"}.
+    """
+    ledger = get_expense_ledger(user_id)
+    with ledger.lock:
+        existing = list(ledger.rows)
+    fresh, skipped = new_expenses(rows, existing)
+
+    repo = get_repository()
+    inserted = []
+    try:
+        for start in range(0, len(fresh), chunk_size):
+            payload = [{"id": user_id, **r} for r in fresh[start:start + chunk_size]]
+            count_query("expense_profile")
+            inserted.extend(repo.insert_expenses(payload))
+    finally:
+        record_expenses(user_id, inserted)
+    return {"inserted": len(inserted), "skipped": skipped}
+
+# --- Write-behind queue for new expenses (one per session) ---
+def get_write_queue(user_id: str) -> ExpenseWriteQueue:
+    """
+    This session's queue. Its worker thread has no script context, so the
+    repository (bound to the client pool), ledger store and query counter are captured here.
+    """
+    queue = st.session_state.get("expense_write_queue")
+    if queue is not None and queue.user_id == user_id:
+        return queue
+
+    repo, store, counter = get_repository(), get_ledger_store(), get_query_counter()
+    if isinstance(repo, SupabaseRepository):
+        pool, fallback = get_client_pool(), client_for(user_id)
+
+        def pooled_client(uid):
+            entry = pool.get(uid)
+            return entry.client if entry is not None else fallback
+
+        repo = SupabaseRepository(pooled_client)
+
+    def count():
+        with _counter_lock:
+            counter["expense_profile"] += 1
+
+    def insert_rows(payloads):
+        count()
+        return repo.insert_expenses_once(payloads)
+
+    def delete_rows(expense_ids):
+        count()
+        repo.delete_expenses(user_id, expense_ids)
+
+    queue = ExpenseWriteQueue(user_id, insert_rows, delete_rows, lambda: store.peek(user_id))
+    st.session_state["expense_write_queue"] = queue
+    return queue
+
+def queue_expense(user_id: str, payload: dict) -> str:
+    """Shows the expense in the cached ledger now and saves it in the background. Returns its temporary id."""
+    return get_write_queue(user_id).add(payload)
+
+def delete_expenses(user_id: str, expense_ids):
+    """Deletes many expenses in one request, then drops them from the cached ledger."""
+    expense_ids = list(expense_ids)
+    pending = [eid for eid in expense_ids if is_pending(eid)]
+    if pending:
+        get_write_queue(user_id).cancel(pending)
+        expense_ids = [eid for eid in expense_ids if not is_pending(eid)]
+    if not expense_ids:
+        return
+    count_query("expense_profile")
+    get_repository().delete_expenses(user_id, expense_ids)
+    forget_expenses(user_id, expense_ids)
+
+def update_expense_categories(user_id: str, changes: dict):
+    """
+    changes : expense_id -> new category. Sent as one upsert of the full rows
+    (taken from the cached ledger), whose result is merged back into the ledger.
+    Rows still waiting in the write queue are skipped.
+    """
+    changes = {eid: c for eid, c in changes.items() if not is_pending(eid)}
+    if not changes:
+        return
+    ledger = get_expense_ledger(user_id)
+    with ledger.lock:
+        rows = [ledger.by_id[eid] for eid in changes if eid in ledger.by_id]
+    payload = [
+        {
+            "expense_id": r["expense_id"],
+            "id": user_id,
+            "expense_date": r["expense_date"],
+            "amount": r["amount"],
+            "Notes": r.get("Notes"),
+            "category": changes[r["expense_id"]],
+        }
+        for r in rows
+    ]
+    count_query("expense_profile")
+    record_expenses(user_id, get_repository().upsert_expenses(payload))
+
+def forget_expenses(user_id: str, expense_ids):
+    """After a delete: drop the rows from the cached ledger, no reload needed."""
+    ledger = get_ledger_store().peek(user_id)
+    if ledger is not None:
+        ledger.remove(expense_ids)
@@ -1,3 +1,8 @@
+import numpy as np
+
+from tax_rules import TaxSchedule, load_registry
+
+
 def calculate_tax(taxable_income, brackets):
 	"""
 	taxable_income : float
@@ -31,8 +36,19 @@ def calculate_tax(taxable_income, brackets):
 	return tax_owed
 
 
+# -----------------------
+# Tax rules (parsed once at import; see tax_rules.py and data/tax/)
+# -----------------------
+TAX_REGISTRY = load_registry()
+DEFAULT_RULES = TAX_REGISTRY.rules(2026, "single", "MI")
+
+
 def income_c(gross_income, cont401k_personal=0, match401k_rate=0, 
-           HSA_cont_monthly=0, healthcare_cost_permonth=0, debug=False):
+           HSA_cont_monthly=0, healthcare_cost_permonth=0, debug=False, rules=None):
+	"""
+	rules : a tax_rules.RuleSet (federal year/filing status + state); defaults to DEFAULT_RULES
+	"""
+	rules = rules or DEFAULT_RULES
 
 	if gross_income == 0:
 		return 0,0,0
@@ -43,18 +59,15 @@ def income_c(gross_income, cont401k_personal=0, match401k_rate=0,
 	HSA_cont = HSA_cont_monthly * 12
 	healthcare_cost = healthcare_cost_permonth * 12
 
-	FICA_rate = 7.65 / 100
-	standard_deduction = 16100
-
-	michigan_tax_rate = 4.25 / 100
-	michigan_tax_exemption = 5800
+	standard_deduction = rules.federal.standard_deduction
+	state_tax_exemption = rules.state.exemption
 
 	state_taxable_income = (
 		gross_income 
 		- cont401k_rate * gross_income
 		- HSA_cont
 		- healthcare_cost
-		- michigan_tax_exemption)
+		- state_tax_exemption)
 
 	taxable_income = (
 	    gross_income 
@@ -64,23 +77,9 @@ def income_c(gross_income, cont401k_personal=0, match401k_rate=0,
 	    - healthcare_cost
 	)
 
-	# -----------------------
-	# 2026 FEDERAL BRACKETS (Taxable income)
-	# -----------------------
-
-	tax_brackets = [
-		(12400, 0.10),
-		(50400, 0.12),
-		(105700, 0.22),
-		(201775, 0.24),
-		(256225, 0.32),
-		(640600, 0.35),
-		(None,   0.37),
-	]
-
-	income_tax = calculate_tax(taxable_income, tax_brackets)
-	FICA_tax = gross_income * FICA_rate
-	state_tax = state_taxable_income*michigan_tax_rate
+	income_tax = rules.federal.schedule.tax(taxable_income)
+	FICA_tax = rules.federal.payroll_tax(gross_income)
+	state_tax = rules.state.schedule.tax(state_taxable_income)
 
 	net_income = (
 	    gross_income 
@@ -109,4 +108,54 @@ def income_c(gross_income, cont401k_personal=0, match401k_rate=0,
 	    print_row("401k Total (w/ match)", monthly_401k)
 	    print_row("HSA", monthly_HSA)
 
-	return monthly_income, monthly_401k, monthly_HSA
\ No newline at end of file
+	return monthly_income, monthly_401k, monthly_HSA
+
+def income_c_array(gross_income, cont401k_personal=0, match401k_rate=0,
+           HSA_cont_monthly=0, healthcare_cost_permonth=0, rules=None):
+	"""
+	Vectorized income_c: every argument may be a scalar or an array (they broadcast).
+	Returns (monthly_income, monthly_401k, monthly_HSA) as arrays.
+	"""
+	rules = rules or DEFAULT_RULES
+	gross, cont401k, match_rate, hsa_monthly, healthcare_monthly = np.broadcast_arrays(
+		*(np.asarray(a, dtype=float) for a in
+		  (gross_income, cont401k_personal, match401k_rate, HSA_cont_monthly, healthcare_cost_permonth))
+	)
+	has_income = gross != 0
+
+	cont401k_total = cont401k + gross * match_rate
+	HSA_cont = hsa_monthly * 12
+	healthcare_cost = healthcare_monthly * 12
+
+	state_taxable_income = gross - cont401k - HSA_cont - healthcare_cost - rules.state.exemption
+	taxable_income = gross - cont401k - rules.federal.standard_deduction - HSA_cont - healthcare_cost
+
+	income_tax = rules.federal.schedule.tax_array(taxable_income)
+	FICA_tax = rules.federal.payroll_tax_array(gross)
+	state_tax = rules.state.schedule.tax_array(state_taxable_income)
+
+	net_income = gross - FICA_tax - income_tax - cont401k - HSA_cont - healthcare_cost - state_tax
+
+	monthly_income = np.where(has_income, net_income / 12, 0.0)
+	monthly_401k = np.where(has_income, cont401k_total / 12, 0.0)
+	monthly_HSA = np.where(has_income, HSA_cont / 12, 0.0)
+
+	return monthly_income, monthly_401k, monthly_HSA
+
+
+INCOME_COLUMNS = ["gross_income", "cont401k_personal", "match401k_rate", "HSA_cont_monthly", "healthcare_cost_permonth"]
+
+def income_c_frame(df, rules=None):
+	"""
+	income_c over a DataFrame whose columns are named like income_c's arguments
+	(missing optional columns count as 0). Returns a DataFrame with
+	monthly_income, monthly_401k and monthly_HSA, aligned to df's index.
+	"""
+	import pandas as pd
+
+	args = [df[c].to_numpy(dtype=float) if c in df else 0.0 for c in INCOME_COLUMNS]
+	monthly_income, monthly_401k, monthly_HSA = income_c_array(*args, rules=rules)
+	return pd.DataFrame(
+		{"monthly_income": monthly_income, "monthly_401k": monthly_401k, "monthly_HSA": monthly_HSA},
+		index=df.index,
+	)
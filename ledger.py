@@ -0,0 +1,348 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+import pandas as pd
+
+
+ROW_BYTES = 1024  # rough memory per ledger row: the dict and its strings, sort key and by_id slot
+
+class ExpenseLedger:
+    """
+    All of one user's expenses, kept sorted by expense_date.
+
+    Date-range reads are two binary searches plus a slice, so moving the
+    date pickers never needs the network. New rows are merged in by
+    incremental refreshes (created_at > last_seen) or local writes.
+
+    Monthly totals are kept in a month -> total table that every insert and
+    delete updates, so the monthly rollup costs O(months), not O(expenses).
+    The same goes for per-month category totals, which category_totals()
+    combines with the rows of the two edge months only.
+
+    Rows are ordered by (expense_date, expense_id), which page() uses as a
+    keyset cursor.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.rows = []          # sorted by (expense_date, expense_id)
+        self.keys = []          # sort_key(rows[i]), for bisect
+        self.by_id = {}         # expense_id -> row
+        self.months = {}        # "YYYY-MM" -> [total, count]
+        self.month_categories = {}  # "YYYY-MM" -> {category: total}
+        self.last_seen = None   # newest created_at pulled from the server
+        self.loaded_at = 0.0
+        self.checked_at = 0.0
+        self.lock = threading.RLock()
+        self.fetch_lock = threading.Lock()  # held by the one thread loading from the server
+        self._changes = None    # while a full load is in flight: expense_id -> row written here, or None if deleted
+
+    @staticmethod
+    def sort_key(row: dict) -> tuple:
+        # ids are compared within their own type, so a stray non-int id can't break ordering
+        eid = row.get("expense_id")
+        return (row["expense_date"], (0, eid) if isinstance(eid, int) else (1, str(eid)))
+
+    @staticmethod
+    def _clean(row: dict) -> dict:
+        row = dict(row)
+        row["expense_date"] = str(row["expense_date"])[:10]
+        row["amount"] = float(row.get("amount") or 0.0)
+        return row
+
+    def begin_reload(self):
+        """Starts recording local writes, so reset() can re-apply the ones its load may predate."""
+        with self.lock:
+            self._changes = {}
+
+    def cancel_reload(self):
+        with self.lock:
+            self._changes = None
+
+    def reset(self, rows):
+        """
+        Replaces the contents with a full load. What the load can't reflect is kept:
+        optimistic rows still in a write queue (created_at None), rows this process
+        wrote after the load's snapshot, and edits/deletes made here since begin_reload().
+        """
+        rows = list(rows)
+        snapshot = max((r["created_at"] for r in rows if r.get("created_at")), default=None)
+        with self.lock:
+            changes, self._changes = self._changes or {}, None
+            carried = [
+                r for r in self.rows
+                if r.get("created_at") is None or (snapshot is not None and r["created_at"] > snapshot)
+            ]
+            self.rows, self.keys, self.by_id, self.months, self.month_categories = [], [], {}, {}, {}
+            self.last_seen = None
+            self.merge(rows)
+            self.merge(carried, advance=False)
+            self.merge([r for r in changes.values() if r is not None], advance=False)
+            for expense_id, row in changes.items():
+                if row is None:
+                    self._drop(expense_id)
+            self.loaded_at = self.checked_at = time.monotonic()
+
+    def merge(self, rows, advance: bool = True):
+        """
+        Adds (or replaces) rows. With advance=False the rows don't move last_seen,
+        so rows written elsewhere in the meantime are still picked up by the next refresh.
+        """
+        with self.lock:
+            for row in rows:
+                row = self._clean(row)
+                if row.get("expense_id") in self.by_id:
+                    self._drop(row["expense_id"])
+                key = self.sort_key(row)
+                i = bisect_right(self.keys, key)
+                self.rows.insert(i, row)
+                self.keys.insert(i, key)
+                self.by_id[row.get("expense_id")] = row
+                self._add_to_month(row, 1)
+                if self._changes is not None:
+                    self._changes[row.get("expense_id")] = row
+
+                created = row.get("created_at")
+                if advance and created and (self.last_seen is None or created > self.last_seen):
+                    self.last_seen = created
+
+    def _drop(self, expense_id):
+        row = self.by_id.pop(expense_id, None)
+        if row is None:
+            return
+        i = bisect_left(self.keys, self.sort_key(row))
+        while self.rows[i] is not row:
+            i += 1
+        del self.rows[i]
+        del self.keys[i]
+        self._add_to_month(row, -1)
+
+    def _add_to_month(self, row, sign: int):
+        month = row["expense_date"][:7]
+        slot = self.months.setdefault(month, [0.0, 0])
+        slot[0] += sign * row["amount"]
+        slot[1] += sign
+        categories = self.month_categories.setdefault(month, {})
+        category = row.get("category")
+        categories[category] = categories.get(category, 0.0) + sign * row["amount"]
+        if slot[1] == 0:
+            del self.months[month]
+            del self.month_categories[month]
+
+    def remove(self, expense_ids):
+        with self.lock:
+            for expense_id in expense_ids:
+                self._drop(expense_id)
+                if self._changes is not None:
+                    self._changes[expense_id] = None
+
+    def reconcile(self, temp_ids, rows):
+        """Swaps optimistic rows for the server's copies in one step, so readers never see both or neither."""
+        with self.lock:
+            self.remove(temp_ids)
+            self.merge(rows, advance=False)
+
+    def _bounds(self, start_iso: str, end_iso: str):
+        # every key for a date sorts after (date,) and before (date + "~",)
+        return bisect_left(self.keys, (start_iso,)), bisect_left(self.keys, (end_iso + "~",))
+
+    def _slice(self, start_iso: str, end_iso: str) -> list:
+        lo, hi = self._bounds(start_iso, end_iso)
+        return self.rows[lo:hi]
+
+    def page(self, start_iso: str, end_iso: str, limit: int, before: tuple = None):
+        """
+        Keyset page of the range, newest first: up to `limit` rows whose
+        (expense_date, expense_id) sorts before the `before` cursor.
+        Returns (rows, cursor for the next older page or None).
+        """
+        with self.lock:
+            lo, hi = self._bounds(start_iso, end_iso)
+            if before is not None:
+                hi = min(hi, bisect_left(self.keys, before))
+            first = max(lo, hi - limit)
+            rows = self.rows[first:hi]
+            cursor = self.keys[first] if first > lo else None
+        rows.reverse()
+        return rows, cursor
+
+    def count(self, start_iso: str, end_iso: str) -> int:
+        with self.lock:
+            lo, hi = self._bounds(start_iso, end_iso)
+        return hi - lo
+
+    def category_totals(self, start_iso: str, end_iso: str) -> dict:
+        """
+        category -> total spent for start_iso <= expense_date <= end_iso.
+        Whole months come from the running per-month totals; only the rows of
+        a partially covered first/last month are summed.
+        """
+        first_month, last_month = start_iso[:7], end_iso[:7]
+        totals = {}
+
+        def add_rows(rows):
+            for r in rows:
+                totals[r.get("category")] = totals.get(r.get("category"), 0.0) + r["amount"]
+
+        with self.lock:
+            if first_month == last_month:
+                add_rows(self._slice(start_iso, end_iso))
+            else:
+                add_rows(self._slice(start_iso, first_month + "-31"))
+                add_rows(self._slice(last_month + "-01", end_iso))
+                for month, categories in self.month_categories.items():
+                    if first_month < month < last_month:
+                        for category, total in categories.items():
+                            totals[category] = totals.get(category, 0.0) + total
+        return {c: round(t, 2) for c, t in totals.items() if round(t, 2) != 0.0}
+
+    def range(self, start_iso: str, end_iso: str) -> list:
+        """Rows with start_iso <= expense_date <= end_iso, newest first."""
+        with self.lock:
+            rows = self._slice(start_iso, end_iso)
+        rows.reverse()
+        return rows
+
+    def frame(self, start_iso: str, end_iso: str, columns=("expense_date", "category", "amount")) -> pd.DataFrame:
+        with self.lock:
+            rows = self._slice(start_iso, end_iso)
+        return pd.DataFrame([{c: r.get(c) for c in columns} for r in rows], columns=list(columns))
+
+    def monthly_totals(self, start_month: str = None, end_month: str = None) -> pd.DataFrame:
+        """
+        Spending per month for months in [start_month, end_month] ("YYYY-MM", either bound optional).
+        Returns columns month (datetime, first of month) and total (float), oldest first.
+        """
+        with self.lock:
+            months = sorted(
+                (m, round(total, 2)) for m, (total, _) in self.months.items()
+                if (start_month is None or m >= start_month) and (end_month is None or m <= end_month)
+            )
+        return pd.DataFrame({
+            "month": pd.to_datetime([m + "-01" for m, _ in months]),
+            "total": pd.Series([t for _, t in months], dtype=float),
+        })
+
+    def month_category_totals(self, start_month: str = None, end_month: str = None):
+        """(months, categories, totals) lists, one entry per month/category pair in range."""
+        with self.lock:
+            items = [
+                (m, c, t) for m, categories in self.month_categories.items()
+                if (start_month is None or m >= start_month) and (end_month is None or m <= end_month)
+                for c, t in categories.items()
+            ]
+        return [m for m, _, _ in items], [c for _, c, _ in items], [t for _, _, t in items]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class LedgerStore:
+    """
+    Process-wide map of user_id -> ExpenseLedger, bounded by user count and by
+    approximate size (rows x ROW_BYTES); least recently used ledgers are evicted first.
+
+    get() loads a ledger fully the first time (and every full_reload_after seconds);
+    otherwise it only asks the server for rows created since the last check, at
+    most every refresh_after seconds. That incremental check only sees new rows:
+    edits and deletes made from another process or device show up at the next
+    full reload, up to full_reload_after later. This process's own writes update
+    the ledger directly.
+    """
+
+    def __init__(self, max_users: int = 256, max_bytes: int = 256 * 1024 * 1024,
+                 refresh_after: float = 30, full_reload_after: float = 600):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.refresh_after = refresh_after
+        self.full_reload_after = full_reload_after
+        self._ledgers = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0           # get() found the ledger in memory
+        self.misses = 0         # get() had to load it in full
+        self.evictions = 0
+
+    def _evict(self):
+        # caller holds self._lock; ledgers grow as they merge, so sizes are summed each time.
+        # The most recently used ledger always stays, even if it alone is over budget.
+        size = sum(len(ledger) for ledger in self._ledgers.values()) * ROW_BYTES
+        while len(self._ledgers) > 1 and (len(self._ledgers) > self.max_users or size > self.max_bytes):
+            _, ledger = self._ledgers.popitem(last=False)
+            size -= len(ledger) * ROW_BYTES
+            self.evictions += 1
+
+    def _ledger(self, user_id: str) -> ExpenseLedger:
+        with self._lock:
+            ledger = self._ledgers.get(user_id)
+            if ledger is None:
+                ledger = self._ledgers[user_id] = ExpenseLedger(user_id)
+            if ledger.loaded_at:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._ledgers.move_to_end(user_id)
+            self._evict()
+            return ledger
+
+    def get(self, user_id: str, load_rows) -> ExpenseLedger:
+        """
+        load_rows(user_id, since) -> list of rows; since=None means everything.
+        """
+        ledger = self._ledger(user_id)
+        now = time.monotonic()
+        if ledger.loaded_at and now - ledger.loaded_at <= self.full_reload_after and now - ledger.checked_at <= self.refresh_after:
+            return ledger
+
+        # One fetch per ledger at a time, outside ledger.lock so readers aren't held up.
+        # Other sessions keep reading the current contents; a ledger that was never
+        # loaded has none, so those wait for the first load.
+        if not ledger.fetch_lock.acquire(blocking=not ledger.loaded_at):
+            return ledger
+        try:
+            now = time.monotonic()
+            # re-checked: another session may have just finished the same fetch
+            if not ledger.loaded_at or now - ledger.loaded_at > self.full_reload_after:
+                ledger.begin_reload()
+                try:
+                    rows = load_rows(user_id, None)
+                except BaseException:
+                    ledger.cancel_reload()
+                    raise
+                ledger.reset(rows)
+            elif now - ledger.checked_at > self.refresh_after:
+                ledger.merge(load_rows(user_id, ledger.last_seen))
+                ledger.checked_at = now
+        finally:
+            ledger.fetch_lock.release()
+        with self._lock:
+            self._evict()
+        return ledger
+
+    def peek(self, user_id: str):
+        with self._lock:
+            return self._ledgers.get(user_id)
+
+    def discard(self, user_id: str):
+        with self._lock:
+            self._ledgers.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._ledgers.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = sum(len(ledger) for ledger in self._ledgers.values())
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._ledgers),
+                "rows": rows,
+                "bytes": rows * ROW_BYTES,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
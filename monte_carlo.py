@@ -0,0 +1,85 @@
+import csv
+import os
+
+import numpy as np
+
+
+HISTORICAL_RETURNS_FILE = os.path.join(os.path.dirname(__file__), "data", "sp500_annual_returns.csv")
+
+
+def load_annual_returns(path: str = HISTORICAL_RETURNS_FILE) -> np.ndarray:
+    """Reads a year,return CSV (decimal returns, '#' comment lines allowed)."""
+    with open(path, newline="") as f:
+        rows = csv.DictReader(line for line in f if not line.startswith("#"))
+        return np.array([float(r["return"]) for r in rows], dtype=float)
+
+
+def _lognormal_params(mean: float, vol: float):
+    # log-return parameters whose simple return has the given arithmetic mean and volatility
+    sigma2 = np.log1p(vol ** 2 / (1.0 + mean) ** 2)
+    return np.log1p(mean) - sigma2 / 2.0, np.sqrt(sigma2)
+
+
+def simulate_net_worth(
+    pv,
+    monthly_invest,
+    monthly_savings,
+    years,
+    n_paths=10_000,
+    mean=0.07,
+    vol=0.15,
+    historical=None,
+    percentiles=(10, 50, 90),
+    seed=None,
+    chunk_size=25_000,
+):
+    """
+    Monte Carlo net-worth projection.
+
+    Each path draws one return per year, either lognormal with the given arithmetic
+    mean/volatility or bootstrapped from `historical` (an array of annual returns).
+    Within a year, monthly contributions compound at that year's monthly rate;
+    savings earn 0%, as in projection_arrays.
+
+    Paths are simulated chunk_size at a time, so the working set stays bounded;
+    only one float32 value per path per year is kept for the percentiles.
+
+    Returns (t_years, bands) with t_years of shape (years+1,) and bands of shape
+    (len(percentiles), years+1), in dollars.
+    """
+    years = int(years)
+    rng = np.random.default_rng(seed)
+    if historical is None:
+        mu, sigma = _lognormal_params(mean, vol)
+    else:
+        historical = np.asarray(historical, dtype=float)
+
+    wealth_by_year = np.empty((years + 1, n_paths), dtype=np.float32)
+    wealth_by_year[0] = pv
+
+    for start in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - start)
+        # drawn path-major so a given seed gives the same paths whatever the chunk size
+        if historical is None:
+            annual = np.expm1(rng.normal(mu, sigma, size=(size, years)))
+        else:
+            annual = historical[rng.integers(0, len(historical), size=(size, years))]
+        annual = np.ascontiguousarray(annual.T)
+
+        # a year of month-end contributions at r_m = (1+R)^(1/12) - 1 grows to c * R / r_m
+        r_m = np.expm1(np.log1p(annual) / 12.0)
+        zero = np.abs(r_m) < 1e-12
+        annuity = np.divide(annual, r_m, out=np.full_like(annual, 12.0), where=~zero)
+        annuity *= monthly_invest
+
+        growth = annual
+        growth += 1.0
+        wealth = np.full(size, float(pv))
+        for y in range(years):
+            wealth *= growth[y]
+            wealth += annuity[y]
+            wealth_by_year[y + 1, start:start + size] = wealth
+
+    bands = np.percentile(wealth_by_year, percentiles, axis=1)
+    bands += monthly_savings * 12.0 * np.arange(years + 1)
+    return np.arange(years + 1, dtype=float), bands
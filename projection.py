@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def projection_arrays(pv, monthly_invest, monthly_savings, years, annual_returns=(0.05, 0.07, 0.09)):
+    """
+    Vectorized projection: every month for every annual return in one broadcast.
+
+    Returns (t_years, contrib_invest, savings_series, fv) where the first three have
+    shape (n+1,) and fv has shape (len(annual_returns), n+1), n = years * 12.
+    Investments compound monthly at each return; savings earn 0%.
+    """
+    n = int(years * 12)
+    m = np.arange(n + 1, dtype=float)
+    r_m = ((1.0 + np.asarray(annual_returns, dtype=float)) ** (1.0 / 12.0) - 1.0)[:, None]
+
+    growth = (1.0 + r_m) ** m
+
+    # annuity factor ((1+r)^m - 1) / r, which tends to m as r -> 0
+    zero = np.abs(r_m[:, 0]) < 1e-12
+    annuity = growth - 1.0
+    annuity /= np.where(zero, 1.0, r_m[:, 0])[:, None]
+    annuity[zero] = m
+
+    contrib_invest = monthly_invest * m
+    savings_series = monthly_savings * m
+
+    # fv = pv * growth + monthly_invest * annuity + savings, in place
+    fv = growth
+    fv *= pv
+    annuity *= monthly_invest
+    fv += annuity
+    fv += savings_series
+
+    return m / 12.0, contrib_invest, savings_series, fv
@@ -0,0 +1,292 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+
+EXPENSE_COLUMNS = "id, expense_id, expense_date, category, amount, created_at, Notes"
+PAGE_SIZE = 1000  # PostgREST's default max rows per response
+
+
+class Repository(ABC):
+    """
+    Every query the app makes against budget_profile / expense_profile.
+
+    Expense rows are dicts with the EXPENSE_COLUMNS keys; writes return the
+    stored rows (with expense_id and created_at) so callers can merge them
+    into the cached ledger.
+    """
+
+    # --- budget_profile ---
+    @abstractmethod
+    def get_profile(self, user_id: str) -> dict:
+        """{"data": dict or None, "display_name": str or None}, or {} if the user has no profile row."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_profile_data(self, user_id: str, data: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_display_name(self, user_id: str, display_name: str):
+        raise NotImplementedError
+
+    # --- expense_profile ---
+    @abstractmethod
+    def expense_page(self, user_id: str, since: str = None, after: tuple = None, limit: int = PAGE_SIZE) -> list:
+        """
+        Up to `limit` rows ordered by (created_at, expense_id): only rows created
+        after `since`, and after the keyset cursor `after` = (created_at, expense_id).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_expenses(self, rows: list) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert_expenses(self, rows: list) -> list:
+        """Inserts or replaces rows by expense_id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_expenses_once(self, rows: list) -> list:
+        """
+        Inserts rows keyed by their client-generated client_ref: a row whose
+        client_ref is already stored (an earlier attempt that did land) comes
+        back as stored instead of being inserted again. Safe to retry.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_expenses(self, user_id: str, expense_ids: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def monthly_totals(self, user_id: str, start_date: str = None, end_date: str = None) -> list:
+        """[{"month": "YYYY-MM-01", "total": float}], oldest first; bounds are ISO dates, inclusive."""
+        raise NotImplementedError
+
+
+class SupabaseRepository(Repository):
+    """
+    The Supabase tables. client_for(user_id) returns the authenticated client
+    to use, so row-level security sees the right user.
+
+    insert_expenses_once needs a unique client_ref column on expense_profile:
+        alter table expense_profile add column client_ref text unique;
+    """
+
+    def __init__(self, client_for):
+        self.client_for = client_for
+
+    def _table(self, user_id: str, name: str):
+        return self.client_for(user_id).table(name)
+
+    def get_profile(self, user_id: str) -> dict:
+        res = (
+            self._table(user_id, "budget_profile")
+            .select("data, display_name")
+            .eq("id", user_id)
+            .single()
+            .execute()
+        )
+        return res.data or {}
+
+    def save_profile_data(self, user_id: str, data: dict):
+        return self._table(user_id, "budget_profile").update({"data": data}).eq("id", user_id).execute()
+
+    def set_display_name(self, user_id: str, display_name: str):
+        return self._table(user_id, "budget_profile").update({"display_name": display_name}).eq("id", user_id).execute()
+
+    def expense_page(self, user_id: str, since: str = None, after: tuple = None, limit: int = PAGE_SIZE) -> list:
+        query = self._table(user_id, "expense_profile").select(EXPENSE_COLUMNS).eq("id", user_id)
+        if since:
+            query = query.gt("created_at", since)
+        if after:
+            created, expense_id = after
+            query = query.or_(f'created_at.gt."{created}",and(created_at.eq."{created}",expense_id.gt.{expense_id})')
+        return (
+            query.order("created_at")
+            .order("expense_id")
+            .limit(limit)
+            .execute()
+        ).data or []
+
+    def insert_expenses(self, rows: list) -> list:
+        if not rows:
+            return []
+        return self._table(rows[0]["id"], "expense_profile").insert(rows).execute().data or []
+
+    def upsert_expenses(self, rows: list) -> list:
+        if not rows:
+            return []
+        return self._table(rows[0]["id"], "expense_profile").upsert(rows, on_conflict="expense_id").execute().data or []
+
+    def insert_expenses_once(self, rows: list) -> list:
+        if not rows:
+            return []
+        # a conflicting row is "updated" to itself, so it's returned like a fresh insert
+        return self._table(rows[0]["id"], "expense_profile").upsert(rows, on_conflict="client_ref").execute().data or []
+
+    def delete_expenses(self, user_id: str, expense_ids: list):
+        self._table(user_id, "expense_profile").delete().eq("id", user_id).in_("expense_id", list(expense_ids)).execute()
+
+    def monthly_totals(self, user_id: str, start_date: str = None, end_date: str = None) -> list:
+        # the RPC filters by auth.uid(), i.e. the client's user
+        res = self.client_for(user_id).rpc("monthly_expense_totals", {"start_date": start_date, "end_date": end_date}).execute()
+        return [{"month": str(r["month"])[:10], "total": float(r["total"])} for r in res.data or []]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS budget_profile (
+    id           TEXT PRIMARY KEY,
+    display_name TEXT,
+    data         TEXT                -- JSON
+);
+CREATE TABLE IF NOT EXISTS expense_profile (
+    expense_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+    id           TEXT NOT NULL,
+    expense_date TEXT NOT NULL,      -- YYYY-MM-DD
+    category     TEXT,
+    amount       REAL NOT NULL,
+    created_at   TEXT NOT NULL,      -- ISO timestamp, UTC
+    Notes        TEXT,
+    client_ref   TEXT                -- client-generated key for retry-safe inserts
+);
+-- date-range reads and the monthly rollup; amount makes the rollup index-only
+CREATE INDEX IF NOT EXISTS expense_profile_user_date ON expense_profile (id, expense_date, amount);
+-- the ledger's load / incremental refresh keyset
+CREATE INDEX IF NOT EXISTS expense_profile_user_created ON expense_profile (id, created_at, expense_id);
+"""
+
+# run after SQLITE_SCHEMA, once client_ref exists in files created before it was added
+SQLITE_CLIENT_REF_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS expense_profile_client_ref ON expense_profile (client_ref)"
+
+
+class SqliteRepository(Repository):
+    """
+    The same tables in an embedded SQLite file (or ":memory:"), for offline use,
+    load tests and a low-latency local mode. One connection, serialised by a lock.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        if "client_ref" not in {r["name"] for r in self.conn.execute("PRAGMA table_info(expense_profile)")}:
+            self.conn.execute("ALTER TABLE expense_profile ADD COLUMN client_ref TEXT")
+        self.conn.execute(SQLITE_CLIENT_REF_INDEX)
+
+    def _query(self, sql: str, params=()) -> list:
+        with self.lock:
+            return [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+
+    def _write_many(self, sql: str, params: list) -> list:
+        # one transaction per batch; RETURNING gives back the stored rows
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                out = [dict(self.conn.execute(sql, p).fetchone()) for p in params]
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return out
+
+    # --- budget_profile ---
+    def get_profile(self, user_id: str) -> dict:
+        rows = self._query("SELECT data, display_name FROM budget_profile WHERE id = ?", (user_id,))
+        if not rows:
+            return {}
+        row = rows[0]
+        row["data"] = json.loads(row["data"]) if row["data"] else None
+        return row
+
+    def save_profile_data(self, user_id: str, data: dict):
+        # no sign-up trigger here, so create the profile row on first save
+        self._query(
+            "INSERT INTO budget_profile (id, data) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET data = excluded.data",
+            (user_id, json.dumps(data)),
+        )
+
+    def set_display_name(self, user_id: str, display_name: str):
+        self._query(
+            "INSERT INTO budget_profile (id, display_name) VALUES (?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET display_name = excluded.display_name",
+            (user_id, display_name),
+        )
+
+    # --- expense_profile ---
+    def expense_page(self, user_id: str, since: str = None, after: tuple = None, limit: int = PAGE_SIZE) -> list:
+        sql = f"SELECT {EXPENSE_COLUMNS} FROM expense_profile WHERE id = ?"
+        params = [user_id]
+        if since:
+            sql += " AND created_at > ?"
+            params.append(since)
+        if after:
+            sql += " AND (created_at, expense_id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY created_at, expense_id LIMIT ?"
+        params.append(limit)
+        return self._query(sql, params)
+
+    def insert_expenses(self, rows: list) -> list:
+        created_at = datetime.now(timezone.utc).isoformat()
+        return self._write_many(
+            'INSERT INTO expense_profile (id, expense_date, category, amount, created_at, Notes) '
+            "VALUES (?, ?, ?, ?, ?, ?) RETURNING *",
+            [(r["id"], str(r["expense_date"])[:10], r.get("category"), float(r["amount"]), created_at, r.get("Notes")) for r in rows],
+        )
+
+    def upsert_expenses(self, rows: list) -> list:
+        created_at = datetime.now(timezone.utc).isoformat()
+        return self._write_many(
+            'INSERT INTO expense_profile (expense_id, id, expense_date, category, amount, created_at, Notes) '
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (expense_id) DO UPDATE SET id = excluded.id, expense_date = excluded.expense_date, "
+            "category = excluded.category, amount = excluded.amount, Notes = excluded.Notes RETURNING *",
+            [
+                (r.get("expense_id"), r["id"], str(r["expense_date"])[:10], r.get("category"), float(r["amount"]), created_at, r.get("Notes"))
+                for r in rows
+            ],
+        )
+
+    def insert_expenses_once(self, rows: list) -> list:
+        created_at = datetime.now(timezone.utc).isoformat()
+        # DO UPDATE (not DO NOTHING) so RETURNING gives back the row an earlier attempt stored
+        return self._write_many(
+            'INSERT INTO expense_profile (id, expense_date, category, amount, created_at, Notes, client_ref) '
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (client_ref) DO UPDATE SET client_ref = excluded.client_ref RETURNING *",
+            [
+                (r["id"], str(r["expense_date"])[:10], r.get("category"), float(r["amount"]), created_at, r.get("Notes"), r["client_ref"])
+                for r in rows
+            ],
+        )
+
+    def delete_expenses(self, user_id: str, expense_ids: list):
+        expense_ids = list(expense_ids)
+        if not expense_ids:
+            return
+        self._query(
+            f"DELETE FROM expense_profile WHERE id = ? AND expense_id IN ({', '.join('?' * len(expense_ids))})",
+            [user_id, *expense_ids],
+        )
+
+    def monthly_totals(self, user_id: str, start_date: str = None, end_date: str = None) -> list:
+        sql = "SELECT substr(expense_date, 1, 7) || '-01' AS month, SUM(amount) AS total FROM expense_profile WHERE id = ?"
+        params = [user_id]
+        if start_date:
+            sql += " AND expense_date >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND expense_date <= ?"
+            params.append(end_date)
+        return self._query(sql + " GROUP BY month ORDER BY month", params)
@@ -0,0 +1,231 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import suppress
+
+import httpx
+from supabase import create_client, Client, ClientOptions
+
+
+def _b64decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def jwt_claims(token: str) -> dict:
+    """
+    Decodes the payload of a JWT *without* verifying it.
+    Only used for routing (user id) and expiry bookkeeping; the server still verifies every token.
+    """
+    try:
+        return json.loads(_b64decode(token.split(".")[1]))
+    except (AttributeError, IndexError, ValueError):
+        return {}
+
+
+def verify_hs256(token: str, secret: str):
+    """Claims of an unexpired HS256 token signed with `secret`, else None. Local, no network."""
+    try:
+        header, payload, signature = token.split(".")
+        if json.loads(_b64decode(header)).get("alg") != "HS256":
+            return None
+        expected = hmac.new(secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (AttributeError, ValueError):
+        return None
+    return claims if claims.get("exp", 0) > time.time() else None
+
+
+class PooledClient:
+    """
+    One authenticated Supabase client for one user, shared by all of that user's browser sessions.
+
+    Tokens are attached to the client's request headers directly; the client's
+    own auth state (set_session) is never re-initialised. Only two things reach
+    the auth server: checking a token we haven't seen (and only when it can't be
+    verified locally) and refreshing one that is about to expire.
+    """
+
+    # how many tokens per user we remember as "already verified"
+    MAX_KNOWN_TOKENS = 8
+
+    def __init__(self, user_id: str, client: Client):
+        self.user_id = user_id
+        self.client = client
+        self.email = None
+        self.access_token = None
+        self.refresh_token = None
+        self.expires_at = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self._known_access = OrderedDict()
+        self._known_refresh = OrderedDict()
+
+    def knows(self, access_token: str, refresh_token: str) -> bool:
+        return access_token in self._known_access or refresh_token in self._known_refresh
+
+    def expires_within(self, margin: float) -> bool:
+        return self.expires_at - time.time() <= margin
+
+    def _remember(self, access_token: str, refresh_token: str, claims: dict):
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expires_at = claims.get("exp", 0)
+        self.email = claims.get("email") or self.email
+
+        for known, token in ((self._known_access, self.access_token), (self._known_refresh, self.refresh_token)):
+            known[token] = True
+            known.move_to_end(token)
+            while len(known) > self.MAX_KNOWN_TOKENS:
+                known.popitem(last=False)
+
+    def _attach(self):
+        # what the client does on a SIGNED_IN event, minus the session bookkeeping
+        self.client.options.headers["Authorization"] = f"Bearer {self.access_token}"
+        self.client.postgrest.auth(self.access_token)
+
+    def _use_session(self, session):
+        if not session or not session.user or session.user.id != self.user_id:
+            raise PermissionError("Supabase session does not belong to this user")
+        claims = jwt_claims(session.access_token)
+        claims.setdefault("email", session.user.email)
+        self._remember(session.access_token, session.refresh_token, claims)
+        self._attach()
+
+    def adopt(self, session):
+        """A session the auth server just issued (sign-in / sign-up): trusted as is."""
+        self._use_session(session)
+
+    def authenticate(self, access_token: str, refresh_token: str, jwt_secret: str = None, refresh_margin: float = 0):
+        claims = jwt_claims(access_token)
+        if claims.get("sub") != self.user_id:
+            raise PermissionError("Supabase session does not belong to this user")
+        if claims.get("exp", 0) - time.time() <= refresh_margin:
+            # (nearly) expired: the claims above are unverified, so the refresh token is only
+            # stored once the server has accepted it and returned a session for this user
+            self.refresh(refresh_token)
+            return
+
+        verified = verify_hs256(access_token, jwt_secret) if jwt_secret else None
+        if verified is None:
+            # asymmetric keys are checked against the project's (cached) JWKS; HS256 costs one /user call
+            res = self.client.auth.get_claims(access_token)
+            verified = res.claims if res else {}
+        if verified.get("sub") != self.user_id:
+            raise PermissionError("Supabase session does not belong to this user")
+        self._remember(access_token, refresh_token, verified)
+        self._attach()
+
+    def refresh(self, refresh_token: str = None):
+        """Trades refresh_token (default: the entry's own) for a new session; the entry is unchanged if that fails."""
+        res = self.client.auth.refresh_session(refresh_token or self.refresh_token)
+        try:
+            self._use_session(res.session)
+        except PermissionError:
+            # another user's refresh token: the client already switched its headers to that session
+            if self.access_token:
+                self._attach()
+            raise
+
+    def sign_out(self):
+        # revokes the refresh tokens server side, like auth.sign_out() on a logged-in client
+        with suppress(Exception):
+            self.client.auth.admin.sign_out(self.access_token)
+
+
+class ClientPool:
+    """
+    Bounded LRU pool of per-user Supabase clients.
+
+    - every user gets their own client, so auth state is never swapped between users
+    - all clients share one keep-alive HTTP connection pool
+    - a client only talks to the auth server when it sees an unknown token or its token is about to expire;
+      with jwt_secret (the project's HS256 secret) even new tokens are verified locally
+    """
+
+    def __init__(self, url: str, key: str, max_clients: int = 64, idle_timeout: float = 30 * 60, refresh_margin: float = 60,
+                 jwt_secret: str = None):
+        self.url = url
+        self.key = key
+        self.jwt_secret = jwt_secret
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.refresh_margin = refresh_margin
+
+        self._http = httpx.Client(http2=True, follow_redirects=True, timeout=30)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def new_client(self) -> Client:
+        # fresh options per client: the client mutates its own headers on auth events
+        options = ClientOptions(
+            httpx_client=self._http,
+            auto_refresh_token=False,
+            persist_session=False,
+        )
+        return create_client(self.url, self.key, options=options)
+
+    def _evict(self):
+        now = time.monotonic()
+        for user_id in [u for u, e in self._entries.items() if now - e.last_used > self.idle_timeout]:
+            del self._entries[user_id]
+        while len(self._entries) > self.max_clients:
+            self._entries.popitem(last=False)
+
+    def acquire(self, access_token: str, refresh_token: str) -> PooledClient:
+        user_id = jwt_claims(access_token).get("sub")
+        if not user_id:
+            raise ValueError("Access token has no subject")
+
+        entry = self._entry(user_id)
+        with entry.lock:
+            if not entry.knows(access_token, refresh_token):
+                entry.authenticate(access_token, refresh_token, self.jwt_secret, self.refresh_margin)
+            elif entry.expires_within(self.refresh_margin):
+                entry.refresh()
+        return entry
+
+    def _entry(self, user_id: str) -> PooledClient:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                entry = PooledClient(user_id, self.new_client())
+                self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            entry.last_used = time.monotonic()
+            self._evict()
+        return entry
+
+    def adopt(self, session) -> PooledClient:
+        """Registers a freshly issued session, so its first rerun needs no verification."""
+        entry = self._entry(session.user.id)
+        with entry.lock:
+            entry.adopt(session)
+        return entry
+
+    def sign_out(self, user_id: str):
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            entry.sign_out()
+
+    def get(self, user_id: str):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(user_id)
+            entry.last_used = time.monotonic()
+            return entry
+
+    def discard(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
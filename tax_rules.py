@@ -0,0 +1,193 @@
+import json
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+
+import numpy as np
+
+
+TAX_DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "tax")
+FILING_STATUSES = ("single", "married_joint", "head_of_household")
+
+
+class TaxSchedule:
+    """
+    A bracket list compiled once for repeated lookups.
+
+    brackets : list of tuples (upper_limit, rate), same format as calculate_tax
+
+    The tax owed at the bottom of every bracket is precomputed, so tax() is a
+    bisect plus one multiply-add, and tax_array() does the same for a whole
+    array of incomes with searchsorted.
+    """
+
+    __slots__ = ("brackets", "lowers", "base", "rates", "_lowers", "_base", "_rates")
+
+    def __init__(self, brackets):
+        self.brackets = tuple((upper_limit, rate) for upper_limit, rate in brackets)
+
+        lowers = [0.0]
+        base = [0.0]
+        for upper_limit, rate in self.brackets[:-1]:
+            base.append(base[-1] + (float(upper_limit) - lowers[-1]) * rate)
+            lowers.append(float(upper_limit))
+
+        self.lowers = tuple(lowers)   # bottom of each bracket
+        self.base = tuple(base)       # tax owed at the bottom of each bracket
+        self.rates = tuple(rate for _, rate in self.brackets)
+
+        self._lowers = np.array(self.lowers)
+        self._base = np.array(self.base)
+        self._rates = np.array(self.rates)
+        for a in (self._lowers, self._base, self._rates):
+            a.setflags(write=False)
+
+    def tax(self, taxable_income):
+        taxable_income = float(taxable_income)
+        if taxable_income <= 0:
+            return 0.0
+        i = bisect_right(self.lowers, taxable_income) - 1
+        return self.base[i] + (taxable_income - self.lowers[i]) * self.rates[i]
+
+    def tax_array(self, taxable_income):
+        x = np.asarray(taxable_income, dtype=float)
+        i = np.maximum(np.searchsorted(self._lowers, x, side="right") - 1, 0)
+        owed = self._base[i] + (x - self._lowers[i]) * self._rates[i]
+        return np.where(x > 0, owed, 0.0)
+
+
+@dataclass(frozen=True, slots=True)
+class FederalRules:
+    year: int
+    filing_status: str
+    standard_deduction: float
+    schedule: TaxSchedule
+    ss_rate: float
+    ss_wage_base: float
+    medicare_rate: float
+    addl_medicare_rate: float
+    addl_medicare_threshold: float
+    limit_401k: float
+    limit_ira: float
+
+    def payroll_tax(self, wages):
+        """Social Security (up to the wage base) plus Medicare, including the additional Medicare tax."""
+        wages = float(wages)
+        return (
+            self.ss_rate * min(wages, self.ss_wage_base)
+            + self.medicare_rate * wages
+            + self.addl_medicare_rate * max(wages - self.addl_medicare_threshold, 0.0)
+        )
+
+    def payroll_tax_array(self, wages):
+        wages = np.asarray(wages, dtype=float)
+        return (
+            self.ss_rate * np.minimum(wages, self.ss_wage_base)
+            + self.medicare_rate * wages
+            + self.addl_medicare_rate * np.maximum(wages - self.addl_medicare_threshold, 0.0)
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class StateRules:
+    code: str
+    name: str
+    year: int
+    filing_status: str
+    exemption: float     # subtracted before the brackets apply
+    schedule: TaxSchedule
+
+
+@dataclass(frozen=True, slots=True)
+class RuleSet:
+    federal: FederalRules
+    state: StateRules
+
+    @property
+    def key(self):
+        return (self.federal.year, self.federal.filing_status, self.state.code)
+
+
+class TaxRegistry:
+    """
+    Every tax rule set, parsed once from the data files.
+
+    The full (year, filing_status, state) product is built up front, so
+    rules() is a single dict lookup and returns a shared, immutable RuleSet.
+    """
+
+    def __init__(self, federal: dict, states: dict):
+        self._federal = federal    # (year, filing_status) -> FederalRules
+        self._states = states      # (code, year, filing_status) -> StateRules
+        self._rule_sets = {
+            (year, status, code): RuleSet(fed, state)
+            for (year, status), fed in federal.items()
+            for (code, state_year, state_status), state in states.items()
+            if state_year == year and state_status == status
+        }
+        self.years = tuple(sorted({year for year, _ in federal}))
+        self.state_names = {code: state.name for (code, _, _), state in states.items()}
+
+    def rules(self, year: int, filing_status: str = "single", state: str = "MI") -> RuleSet:
+        try:
+            return self._rule_sets[(int(year), filing_status, state)]
+        except KeyError:
+            raise KeyError(f"no tax rules for {year} / {filing_status} / {state}") from None
+
+    def states(self, year: int) -> tuple:
+        year = int(year)
+        return tuple(sorted({code for code, y, _ in self._states if y == year}))
+
+    def filing_statuses(self, year: int) -> tuple:
+        year = int(year)
+        return tuple(s for s in FILING_STATUSES if (year, s) in self._federal)
+
+
+def _per_status(value, status):
+    return float(value[status] if isinstance(value, dict) else value)
+
+
+def _schedule(brackets) -> TaxSchedule:
+    return TaxSchedule((upper, float(rate)) for upper, rate in brackets)
+
+
+def load_registry(data_dir: str = TAX_DATA_DIR) -> TaxRegistry:
+    """Reads federal.json and states.json from data_dir."""
+    with open(os.path.join(data_dir, "federal.json")) as f:
+        federal_data = json.load(f)["years"]
+    with open(os.path.join(data_dir, "states.json")) as f:
+        state_data = json.load(f)["states"]
+
+    federal = {}
+    for year, y in federal_data.items():
+        for status, s in y["filing_status"].items():
+            federal[(int(year), status)] = FederalRules(
+                year=int(year),
+                filing_status=status,
+                standard_deduction=float(s["standard_deduction"]),
+                schedule=_schedule(s["brackets"]),
+                ss_rate=float(y["ss_rate"]),
+                ss_wage_base=float(y["ss_wage_base"]),
+                medicare_rate=float(y["medicare_rate"]),
+                addl_medicare_rate=float(y["addl_medicare_rate"]),
+                addl_medicare_threshold=float(s["addl_medicare_threshold"]),
+                limit_401k=float(y["limit_401k"]),
+                limit_ira=float(y["limit_ira"]),
+            )
+
+    states = {}
+    for code, st in state_data.items():
+        for year, y in st["years"].items():
+            # statuses with the same brackets share one compiled schedule
+            schedule = _schedule(y["brackets"])
+            for status in FILING_STATUSES:
+                states[(code, int(year), status)] = StateRules(
+                    code=code,
+                    name=st["name"],
+                    year=int(year),
+                    filing_status=status,
+                    exemption=_per_status(y["exemption"], status),
+                    schedule=schedule,
+                )
+
+    return TaxRegistry(federal, states)
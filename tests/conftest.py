@@ -0,0 +1,37 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "bench")]
+
+import pytest
+
+import fake_supabase
+from repository import SqliteRepository, SupabaseRepository
+
+
+USERS = ("u1", "u2")
+
+
+def _fake_supabase_repository():
+    db = fake_supabase.FakeDatabase()
+    # Supabase's sign-up trigger creates the profile rows; the repository only updates them
+    db.tables["budget_profile"] = [{"id": u, "data": None, "display_name": None} for u in USERS]
+    clients = {}
+
+    def client_for(user_id):
+        # one client per user, authenticated as that user (the RPC reads the bearer token)
+        if user_id not in clients:
+            client = clients[user_id] = fake_supabase.FakeClient(db)
+            client.options.headers["Authorization"] = "Bearer " + fake_supabase.access_token(user_id)
+        return clients[user_id]
+
+    return SupabaseRepository(client_for)
+
+
+@pytest.fixture(params=["sqlite", "fake_supabase"])
+def repo(request):
+    """The same tests against both backends."""
+    if request.param == "sqlite":
+        return SqliteRepository(":memory:")
+    return _fake_supabase_repository()
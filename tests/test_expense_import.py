@@ -0,0 +1,63 @@
+from expense_import import BankExportError, map_category, new_expenses, parse_bank_export, parse_csv, parse_ofx
+
+import pytest
+
+
+def test_auto_sign_skips_payments_when_spending_is_negative():
+    lines = [
+        "Date,Description,Amount",
+        "01/02/2026,PAYMENT THANK YOU,500.00",
+        "01/03/2026,KROGER #123,-45.10",
+        "01/04/2026,Refund,12.00",
+        "01/05/2026,STARBUCKS,(4.25)",
+    ]
+    rows = list(parse_csv(lines))
+    assert [(r["expense_date"], r["amount"], r["category"]) for r in rows] == [
+        ("2026-01-03", 45.10, "Groceries"),
+        ("2026-01-05", 4.25, "Dining"),
+    ]
+
+
+def test_auto_sign_with_only_positive_amounts_keeps_everything():
+    rows = list(parse_csv(["Transaction Date,Amount,Category", "2026-01-02,10,Groceries", "2026-01-03,5,Gas"]))
+    assert [(r["amount"], r["category"]) for r in rows] == [(10.0, "Groceries"), (5.0, "Transportation")]
+
+
+def test_debit_column_is_always_spending():
+    rows = list(parse_csv(["Posted Date,Payee,Debit,Credit", "1/2/26,Netflix,15.49,", "1/3/26,Payroll,,2000"]))
+    assert [(r["expense_date"], r["amount"], r["category"]) for r in rows] == [("2026-01-02", 15.49, "Subscriptions")]
+
+
+def test_missing_columns_raise():
+    with pytest.raises(BankExportError):
+        list(parse_csv(["When,What", "2026-01-02,x"]))
+
+
+def test_ofx_sgml_debits_only():
+    statement = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260105120000<TRNAMT>-23.40<NAME>SHELL OIL 5731
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260106<TRNAMT>100.00<NAME>DEPOSIT
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"""
+    rows = list(parse_bank_export(statement.splitlines(), "statement.QFX"))
+    assert rows == [{"expense_date": "2026-01-05", "amount": 23.4, "category": "Transportation", "Notes": "SHELL OIL 5731"}]
+
+
+def test_ofx_xml():
+    statement = "<STMTTRN><DTPOSTED>20260107</DTPOSTED><TRNAMT>-9.99</TRNAMT><MEMO>SPOTIFY</MEMO></STMTTRN>"
+    assert [r["category"] for r in parse_ofx([statement])] == ["Subscriptions"]
+
+
+def test_map_category_falls_back_to_other():
+    assert map_category("Food & Drink") == "Dining"
+    assert map_category(None, "unknown merchant") == "Other"
+
+
+def test_dedupe_is_one_for_one():
+    coffee = {"expense_date": "2026-01-02", "amount": 4.25, "Notes": "STARBUCKS"}
+    existing = [{**coffee, "expense_id": 1, "amount": "4.25"}]
+    fresh, skipped = new_expenses([coffee, dict(coffee), {**coffee, "Notes": "other"}], existing)
+    assert skipped == 1
+    assert [r["Notes"] for r in fresh] == ["STARBUCKS", "other"]
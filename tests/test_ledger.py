@@ -0,0 +1,118 @@
+import threading
+
+from ledger import ExpenseLedger, LedgerStore, ROW_BYTES
+
+
+def row(expense_id, day, amount=10.0, category="Dining", created_at=""):
+    created_at = f"2026-01-01T00:00:{expense_id:02d}" if created_at == "" else created_at
+    return {"expense_id": expense_id, "expense_date": day, "amount": amount, "category": category, "created_at": created_at}
+
+
+def ledger_with(rows):
+    ledger = ExpenseLedger("u1")
+    ledger.reset(rows)
+    return ledger
+
+
+def test_page_walks_the_range_newest_first():
+    ledger = ledger_with([row(i, f"2026-01-{i:02d}") for i in range(1, 11)])
+    seen, cursor = [], None
+    while True:
+        page, cursor = ledger.page("2026-01-03", "2026-01-09", 3, before=cursor)
+        seen += [r["expense_id"] for r in page]
+        if cursor is None:
+            break
+    assert seen == [9, 8, 7, 6, 5, 4, 3]
+    assert ledger.count("2026-01-03", "2026-01-09") == 7
+
+
+def test_category_totals_match_a_plain_sum():
+    rows = [row(i, f"2026-{1 + i % 4:02d}-{1 + i % 28:02d}", amount=i, category=("Dining", "Groceries")[i % 2]) for i in range(1, 60)]
+    ledger = ledger_with(rows)
+    start, end = "2026-01-15", "2026-03-10"
+    expected = {}
+    for r in rows:
+        if start <= r["expense_date"] <= end:
+            expected[r["category"]] = expected.get(r["category"], 0.0) + r["amount"]
+    assert ledger.category_totals(start, end) == expected
+
+
+def test_monthly_totals_follow_removals():
+    ledger = ledger_with([row(1, "2026-01-05"), row(2, "2026-01-06"), row(3, "2026-02-01")])
+    ledger.remove([3])
+    totals = ledger.monthly_totals()
+    assert list(totals["total"]) == [20.0]
+    assert ledger.month_category_totals() == (["2026-01"], ["Dining"], [20.0])
+
+
+def test_reset_keeps_pending_and_newer_rows():
+    ledger = ledger_with([row(1, "2026-01-01"), row(2, "2026-01-02")])
+    ledger.merge([row("pending-a", "2026-01-03", created_at=None)], advance=False)
+    ledger.merge([row(3, "2026-01-04", created_at="2026-01-01T00:00:09")], advance=False)
+
+    # a load taken before row 3 was written, and after row 2 was deleted elsewhere
+    ledger.reset([row(1, "2026-01-01"), row(5, "2026-01-05")])
+    assert sorted(map(str, ledger.by_id)) == ["1", "3", "5", "pending-a"]
+
+
+def test_reset_reapplies_local_writes_made_during_the_load():
+    ledger = ledger_with([row(1, "2026-01-01"), row(2, "2026-01-02")])
+    snapshot = [row(1, "2026-01-01"), row(2, "2026-01-02")]
+
+    ledger.begin_reload()
+    ledger.remove([1])
+    ledger.merge([row(2, "2026-01-02", category="Groceries")], advance=False)
+    ledger.reset(snapshot)
+
+    assert list(ledger.by_id) == [2]
+    assert ledger.by_id[2]["category"] == "Groceries"
+
+
+def test_store_refreshes_incrementally():
+    server = [row(1, "2026-01-01")]
+    calls = []
+
+    def load_rows(user_id, since):
+        calls.append(since)
+        return [r for r in server if since is None or r["created_at"] > since]
+
+    store = LedgerStore(refresh_after=0, full_reload_after=3600)
+    ledger = store.get("u1", load_rows)
+    server.append(row(2, "2026-01-02"))
+    assert store.get("u1", load_rows) is ledger
+    assert calls == [None, "2026-01-01T00:00:01"]
+    assert len(ledger) == 2
+
+
+def test_store_evicts_least_recently_used_past_the_byte_budget():
+    store = LedgerStore(max_bytes=250 * ROW_BYTES)
+    load_rows = lambda user_id, since: [row(i, "2026-01-01") for i in range(1, 101)]
+    for user_id in ("a", "b", "c"):
+        store.get(user_id, load_rows)
+    store.get("b", load_rows)
+
+    stats = store.stats()
+    assert store.peek("a") is None and store.peek("b") is not None
+    assert (stats["users"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 3, 1)
+
+
+def test_store_serves_current_rows_while_reloading():
+    reloading, release = threading.Event(), threading.Event()
+    loads = []
+
+    def load_rows(user_id, since):
+        loads.append(since)
+        if len(loads) > 1:
+            reloading.set()
+            release.wait(5)
+        return [row(1, "2026-01-01")]
+
+    store = LedgerStore(refresh_after=0, full_reload_after=0)
+    ledger = store.get("u1", load_rows)
+    worker = threading.Thread(target=store.get, args=("u1", load_rows))
+    worker.start()
+    reloading.wait(5)
+    # the reload holds the fetch lock, not the ledger lock: readers get the current rows
+    assert store.get("u1", load_rows) is ledger and ledger.count("2026-01-01", "2026-01-31") == 1
+    release.set()
+    worker.join()
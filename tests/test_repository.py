@@ -0,0 +1,74 @@
+from repository import PAGE_SIZE, Repository
+
+import pytest
+
+
+def expenses(user_id, days, amount=10.0, category="Dining"):
+    return [{"id": user_id, "expense_date": d, "category": category, "amount": amount, "Notes": f"n{i}"} for i, d in enumerate(days)]
+
+
+def test_repository_is_abstract():
+    with pytest.raises(TypeError):
+        Repository()
+
+
+def test_profile_round_trip(repo):
+    repo.save_profile_data("u1", {"annual_salary": 1.0})
+    repo.set_display_name("u1", "Sam")
+    profile = repo.get_profile("u1")
+    assert profile["data"] == {"annual_salary": 1.0}
+    assert profile["display_name"] == "Sam"
+
+
+def test_insert_returns_stored_rows(repo):
+    rows = repo.insert_expenses(expenses("u1", ["2026-01-02", "2026-01-03"]))
+    assert [r["expense_date"] for r in rows] == ["2026-01-02", "2026-01-03"]
+    assert all(r["expense_id"] and r["created_at"] for r in rows)
+
+
+def test_expense_page_keyset_and_since(repo):
+    repo.insert_expenses(expenses("u1", [f"2026-01-{d:02d}" for d in range(1, 8)]))
+    repo.insert_expenses(expenses("u2", ["2026-01-01"]))
+
+    first = repo.expense_page("u1", limit=3)
+    after = (first[-1]["created_at"], first[-1]["expense_id"])
+    rest = repo.expense_page("u1", after=after, limit=PAGE_SIZE)
+    assert len(first) == 3 and len(rest) == 4
+    assert {r["expense_id"] for r in first}.isdisjoint(r["expense_id"] for r in rest)
+    assert all(r["id"] == "u1" for r in first + rest)
+
+    newest = max(r["created_at"] for r in first + rest)
+    added = repo.insert_expenses(expenses("u1", ["2026-02-01"]))
+    assert [r["expense_id"] for r in repo.expense_page("u1", since=newest)] == [added[0]["expense_id"]]
+
+
+def test_upsert_and_delete(repo):
+    row = repo.insert_expenses(expenses("u1", ["2026-01-02"]))[0]
+    repo.upsert_expenses([{**row, "category": "Groceries"}])
+    assert [r["category"] for r in repo.expense_page("u1")] == ["Groceries"]
+
+    repo.delete_expenses("u1", [row["expense_id"]])
+    assert repo.expense_page("u1") == []
+
+
+def test_insert_expenses_once_is_idempotent(repo):
+    payload = [{**e, "client_ref": f"pending-{i}"} for i, e in enumerate(expenses("u1", ["2026-01-02", "2026-01-03"]))]
+    first = repo.insert_expenses_once(payload)
+    again = repo.insert_expenses_once(payload)
+    assert [r["expense_id"] for r in again] == [r["expense_id"] for r in first]
+    assert len(repo.expense_page("u1")) == 2
+
+
+def test_monthly_totals(repo):
+    repo.insert_expenses(expenses("u1", ["2026-01-05", "2026-01-20", "2026-02-01", "2026-03-31"]))
+    repo.insert_expenses(expenses("u2", ["2026-01-05"], amount=99.0))
+
+    assert repo.monthly_totals("u1") == [
+        {"month": "2026-01-01", "total": 20.0},
+        {"month": "2026-02-01", "total": 10.0},
+        {"month": "2026-03-01", "total": 10.0},
+    ]
+    assert repo.monthly_totals("u1", "2026-01-10", "2026-02-28") == [
+        {"month": "2026-01-01", "total": 10.0},
+        {"month": "2026-02-01", "total": 10.0},
+    ]
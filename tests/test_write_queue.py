@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+
+from ledger import ExpenseLedger
+from repository import SqliteRepository
+from write_queue import ExpenseWriteQueue, is_pending
+
+
+@pytest.fixture
+def repo():
+    return SqliteRepository(":memory:")
+
+
+@pytest.fixture
+def ledger():
+    ledger = ExpenseLedger("u1")
+    ledger.reset([])
+    return ledger
+
+
+def make_queue(repo, ledger, insert_rows=None, **kwargs):
+    deleted = []
+
+    def delete_rows(expense_ids):
+        deleted.extend(expense_ids)
+        repo.delete_expenses("u1", expense_ids)
+
+    queue = ExpenseWriteQueue(
+        "u1", insert_rows or repo.insert_expenses_once, delete_rows, lambda: ledger,
+        linger=0.01, backoff=0.001, **kwargs
+    )
+    return queue, deleted
+
+
+def payload(day="2026-01-02", amount=12.5):
+    return {"id": "u1", "expense_date": day, "category": "Dining", "amount": amount, "Notes": ""}
+
+
+def stored(repo):
+    return repo.expense_page("u1")
+
+
+def test_add_shows_the_row_then_reconciles(repo, ledger):
+    queue, _ = make_queue(repo, ledger)
+    temp_id = queue.add(payload())
+    assert is_pending(temp_id) and temp_id in ledger.by_id
+
+    assert queue.flush(5)
+    [saved] = stored(repo)
+    assert list(ledger.by_id) == [saved["expense_id"]]
+
+
+def test_rows_added_together_go_in_one_batch(repo, ledger):
+    batches = []
+
+    def insert_rows(payloads):
+        batches.append(len(payloads))
+        return repo.insert_expenses_once(payloads)
+
+    queue, _ = make_queue(repo, ledger, insert_rows)
+    queue.linger = 0.2
+    for day in range(1, 6):
+        queue.add(payload(f"2026-01-{day:02d}"))
+    assert queue.flush(5)
+    assert batches == [5]
+
+
+def test_retry_after_a_committed_timeout_does_not_duplicate(repo, ledger):
+    attempts = []
+
+    def insert_rows(payloads):
+        attempts.append(len(payloads))
+        rows = repo.insert_expenses_once(payloads)
+        if len(attempts) == 1:
+            raise TimeoutError("response lost after commit")
+        return rows
+
+    queue, _ = make_queue(repo, ledger, insert_rows)
+    queue.add(payload())
+    assert queue.flush(5)
+    assert len(attempts) == 2
+    assert len(stored(repo)) == 1 and len(ledger) == 1
+
+
+def test_gives_up_after_max_attempts_and_retry_failed_resends(repo, ledger):
+    down = [True]
+
+    def insert_rows(payloads):
+        if down[0]:
+            raise ConnectionError("down")
+        return repo.insert_expenses_once(payloads)
+
+    queue, _ = make_queue(repo, ledger, insert_rows, max_attempts=2)
+    queue.add(payload())
+    assert queue.flush(5)
+    assert queue.status()["failed"] == 1 and len(ledger) == 0
+
+    down[0] = False
+    queue.retry_failed()
+    assert queue.flush(5)
+    assert queue.status() == {"pending": 0, "failed": 0, "error": None}
+    assert len(stored(repo)) == 1
+
+
+def test_cancel_before_send(repo, ledger):
+    queue, _ = make_queue(repo, ledger)
+    queue.linger = 0.5
+    temp_id = queue.add(payload())
+    queue.cancel([temp_id])
+    assert queue.flush(5)
+    assert stored(repo) == [] and len(ledger) == 0
+
+
+def test_cancel_in_flight_deletes_the_saved_row(repo, ledger):
+    sending, release = threading.Event(), threading.Event()
+
+    def insert_rows(payloads):
+        sending.set()
+        release.wait(5)
+        return repo.insert_expenses_once(payloads)
+
+    queue, deleted = make_queue(repo, ledger, insert_rows)
+    temp_id = queue.add(payload())
+    sending.wait(5)
+    queue.cancel([temp_id])
+    release.set()
+    assert queue.flush(5)
+    assert len(deleted) == 1 and stored(repo) == [] and len(ledger) == 0
+
+
+def test_cancel_in_flight_then_failure_is_not_retried(repo, ledger):
+    sending, release = threading.Event(), threading.Event()
+    attempts = []
+
+    def insert_rows(payloads):
+        attempts.append(payloads)
+        sending.set()
+        release.wait(5)
+        raise ConnectionError("down")
+
+    queue, _ = make_queue(repo, ledger, insert_rows)
+    temp_id = queue.add(payload())
+    sending.wait(5)
+    queue.cancel([temp_id])
+    release.set()
+    assert queue.flush(5)
+    assert len(attempts) == 1
+    assert queue.status()["failed"] == 0 and not queue._cancelled
@@ -0,0 +1,209 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import wraps
+
+
+# Off unless BUDGET_TIMINGS=1; when off, span()/timed() cost one global lookup.
+ENABLED = os.environ.get("BUDGET_TIMINGS", "").lower() in ("1", "true", "yes", "on")
+
+# histogram upper bounds in seconds (OpenMetrics "le"), plus an implicit +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SESSION_KEY = "_timings"
+
+
+def enable(on: bool = True):
+    global ENABLED
+    ENABLED = on
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate, interpolating inside the bucket (capped at the observed max)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class Timings:
+    """One session's spans: a histogram per (span name, cache tag), plus the most recent spans."""
+
+    def __init__(self, recent: int = 200):
+        self.lock = threading.Lock()
+        self.histograms = {}        # (name, tag) -> Histogram
+        self.recent = deque(maxlen=recent)
+        self.reruns = 0
+
+    def observe(self, name: str, tag, seconds: float):
+        with self.lock:
+            hist = self.histograms.get((name, tag))
+            if hist is None:
+                hist = self.histograms[(name, tag)] = Histogram()
+            hist.observe(seconds)
+            self.recent.append((name, tag, seconds))
+
+    def rows(self) -> list:
+        with self.lock:
+            items = sorted(self.histograms.items(), key=lambda kv: -kv[1].total)
+            return [
+                {
+                    "span": name,
+                    "cache": tag or "",
+                    "count": h.count,
+                    "total_ms": round(h.total * 1000, 2),
+                    "mean_ms": round(h.total / h.count * 1000, 3),
+                    "p50_ms": round(h.quantile(0.5) * 1000, 3),
+                    "p95_ms": round(h.quantile(0.95) * 1000, 3),
+                    "max_ms": round(h.max * 1000, 3),
+                }
+                for (name, tag), h in items
+            ]
+
+    def openmetrics(self, labels: dict = None) -> str:
+        """The histograms in OpenMetrics text format."""
+        base = "".join(f',{k}="{v}"' for k, v in (labels or {}).items())
+        lines = ["# TYPE budget_span_seconds histogram", "# UNIT budget_span_seconds seconds"]
+        with self.lock:
+            for (name, tag), h in sorted(self.histograms.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+                series = f'span="{name}",cache="{tag or ""}"{base}'
+                cumulative = 0
+                for le, n in zip(BUCKETS + ("+Inf",), h.counts):
+                    cumulative += n
+                    lines.append(f'budget_span_seconds_bucket{{{series},le="{le}"}} {cumulative}')
+                lines.append(f"budget_span_seconds_count{{{series}}} {h.count}")
+                lines.append(f"budget_span_seconds_sum{{{series}}} {h.total:.6f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def json_lines(self, labels: dict = None) -> str:
+        """One JSON object per (span, cache tag) histogram."""
+        with self.lock:
+            return "".join(
+                json.dumps({
+                    **(labels or {}),
+                    "span": name,
+                    "cache": tag,
+                    "count": h.count,
+                    "sum_s": round(h.total, 6),
+                    "max_s": round(h.max, 6),
+                    "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts)),
+                }) + "\n"
+                for (name, tag), h in self.histograms.items()
+            )
+
+
+def session_timings():
+    """This session's Timings (created on first use), or None outside a script thread."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    import streamlit as st
+    timings = st.session_state.get(SESSION_KEY)
+    if timings is None:
+        timings = st.session_state[SESSION_KEY] = Timings()
+    return timings
+
+
+# --- spans ---
+_local = threading.local()   # .stack: the spans open on this thread, innermost last
+
+
+class _Span:
+    __slots__ = ("name", "tag", "sink", "start")
+
+    def __init__(self, name, tag, sink):
+        self.name = name
+        self.tag = tag
+        self.sink = sink
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _local.stack.pop()
+        self.sink.observe(self.name, self.tag, elapsed)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+def span(name: str, tag: str = None):
+    """Context manager timing a block into this session's histograms."""
+    if not ENABLED:
+        return NO_SPAN
+    sink = session_timings()
+    return NO_SPAN if sink is None else _Span(name, tag, sink)
+
+
+def miss():
+    """Called by a cached function's loader: the open cached spans on this thread were misses."""
+    if not ENABLED:
+        return
+    for s in getattr(_local, "stack", ()):
+        if s.tag == "hit":
+            s.tag = "miss"
+
+
+def timed(name: str, cached: bool = False):
+    """
+    Decorator form of span(). With cached=True the span is tagged "hit" unless
+    the function's loader calls miss().
+    """
+    tag = "hit" if cached else None
+
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with span(name, tag):
+                return fn(*args, **kwargs)
+        # keep st.cache_data's .clear() reachable
+        if hasattr(fn, "clear"):
+            wrapper.clear = fn.clear
+        return wrapper
+    return decorate
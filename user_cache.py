@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def approx_size(value) -> int:
+    """Rough in-memory size of a cached value, in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value, expires_at, size):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class UserCache:
+    """
+    Process-wide cache of query results, partitioned by user.
+
+    Keys are tuples whose first item is the query kind ("profile", ...), so a
+    write can drop one kind of a user's entries; other users are never touched.
+
+    The cache is bounded by entry count and by approximate size in bytes;
+    the least recently used entries (across all users) are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lru = OrderedDict()   # (user_id, key) -> _Entry, oldest first
+        self._keys = {}             # user_id -> set of keys, for invalidation
+        self._loading = {}          # user_id -> loads in flight
+        self._writes = {}           # user_id -> invalidations seen by those loads; dropped with the last one
+        self._clears = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, user_id, key):
+        entry = self._lru.pop((user_id, key), None)
+        if entry is not None:
+            self._bytes -= entry.size
+            keys = self._keys.get(user_id)
+            keys.discard(key)
+            if not keys:
+                del self._keys[user_id]
+
+    def _evict(self):
+        while self._lru and (len(self._lru) > self.max_entries or self._bytes > self.max_bytes):
+            user_id, key = next(iter(self._lru))
+            self._remove(user_id, key)
+
+    def get_or_load(self, user_id: str, key: tuple, loader, ttl: float):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lru.get((user_id, key))
+            if entry is not None and entry.expires_at > now:
+                self._lru.move_to_end((user_id, key))
+                return entry.value
+            if entry is not None:
+                self._remove(user_id, key)
+            self._loading[user_id] = self._loading.get(user_id, 0) + 1
+            writes = (self._writes.get(user_id, 0), self._clears)
+
+        # network call happens outside the lock
+        try:
+            value = loader()
+            size = approx_size(value)
+        except BaseException:
+            with self._lock:
+                self._done_loading(user_id)
+            raise
+
+        with self._lock:
+            # a write landed while we were loading: don't cache a possibly stale result
+            if (self._writes.get(user_id, 0), self._clears) == writes and size <= self.max_bytes:
+                self._remove(user_id, key)
+                self._lru[(user_id, key)] = _Entry(value, time.monotonic() + ttl, size)
+                self._keys.setdefault(user_id, set()).add(key)
+                self._bytes += size
+                self._evict()
+            self._done_loading(user_id)
+        return value
+
+    def _done_loading(self, user_id):
+        self._loading[user_id] -= 1
+        if not self._loading[user_id]:
+            del self._loading[user_id]
+            self._writes.pop(user_id, None)
+
+    def invalidate(self, user_id: str, kinds=None):
+        """kinds : only drop keys of these kinds (default: all kinds)"""
+        with self._lock:
+            if user_id in self._loading:
+                self._writes[user_id] = self._writes.get(user_id, 0) + 1
+            for key in list(self._keys.get(user_id, ())):
+                if kinds is None or key[0] in kinds:
+                    self._remove(user_id, key)
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self._lru.clear()
+            self._keys.clear()
+            self._bytes = 0
@@ -0,0 +1,188 @@
+import threading
+import time
+import uuid
+
+
+PENDING_PREFIX = "pending-"
+
+
+def is_pending(expense_id) -> bool:
+    return isinstance(expense_id, str) and expense_id.startswith(PENDING_PREFIX)
+
+
+class _Item:
+    __slots__ = ("temp_id", "payload", "attempts")
+
+    def __init__(self, temp_id, payload):
+        self.temp_id = temp_id
+        self.payload = payload
+        self.attempts = 0
+
+
+class ExpenseWriteQueue:
+    """
+    Per-session write-behind queue for new expenses.
+
+    add() puts an optimistic row (expense_id "pending-<uuid>") into the cached
+    ledger straight away and returns; a background thread sends queued rows in
+    batches of up to batch_size, retrying with exponential backoff. When a batch
+    lands, the pending rows are swapped for the server rows (real expense_id,
+    created_at) in one ledger update.
+
+    Each payload is sent with its temp id as client_ref, so a retry after a
+    failure the server had in fact committed (e.g. a timeout) can't duplicate it.
+
+    insert_rows(payloads) -> rows the server returned, in the same order; must be
+        idempotent on client_ref (Repository.insert_expenses_once).
+    delete_rows(expense_ids) -> deletes rows that were cancelled while in flight.
+    get_ledger() -> the cached ExpenseLedger, or None if it isn't loaded.
+    """
+
+    def __init__(self, user_id, insert_rows, delete_rows, get_ledger, batch_size=100, linger=0.25,
+                 max_attempts=6, backoff=0.5, max_backoff=30.0):
+        self.user_id = user_id
+        self.insert_rows = insert_rows
+        self.delete_rows = delete_rows
+        self.get_ledger = get_ledger
+        self.batch_size = batch_size
+        self.linger = linger              # wait this long for more rows before a flush
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._queue = []                  # _Item, oldest first
+        self._in_flight = []
+        self._failed = []                 # _Item that ran out of attempts
+        self._cancelled = set()           # temp ids deleted before they were saved
+        self.last_error = None
+        self._cond = threading.Condition()
+        self._worker = None
+
+    def _show(self, items):
+        # optimistic rows; created_at=None keeps them out of the ledger's refresh cursor
+        ledger = self.get_ledger()
+        if ledger is not None:
+            ledger.merge([{**i.payload, "expense_id": i.temp_id, "created_at": None} for i in items], advance=False)
+
+    def _ensure_worker(self):
+        # caller holds self._cond. A running worker is left to linger for a fuller
+        # batch; it's only woken early once a whole batch is waiting.
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name=f"expense-writes-{self.user_id[:8]}", daemon=True)
+            self._worker.start()
+        elif len(self._queue) >= self.batch_size:
+            self._cond.notify()
+
+    # --- called from the script thread ---
+    def add(self, payload: dict) -> str:
+        item = _Item(PENDING_PREFIX + uuid.uuid4().hex, payload)
+        self._show([item])
+        with self._cond:
+            self._queue.append(item)
+            self._ensure_worker()
+        return item.temp_id
+
+    def cancel(self, temp_ids):
+        """Drops pending rows; ones already being sent are dropped once they land."""
+        temp_ids = set(temp_ids)
+        with self._cond:
+            self._queue = [i for i in self._queue if i.temp_id not in temp_ids]
+            self._failed = [i for i in self._failed if i.temp_id not in temp_ids]
+            self._cancelled |= temp_ids & {i.temp_id for i in self._in_flight}
+        ledger = self.get_ledger()
+        if ledger is not None:
+            ledger.remove(temp_ids)
+
+    def retry_failed(self):
+        with self._cond:
+            items, self._failed = self._failed, []
+            for item in items:
+                item.attempts = 0
+            self._queue[:0] = items
+        self._show(items)
+        with self._cond:
+            self._ensure_worker()
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._queue) + len(self._in_flight),
+                "failed": len(self._failed),
+                "error": self.last_error,
+            }
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Blocks until nothing is queued or in flight (or timeout). True if drained."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+            while self._queue or self._in_flight:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    # --- background thread ---
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue:
+                    self._worker = None
+                    return
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(self.linger)
+                batch = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+                self._in_flight = batch
+            if not batch:
+                continue  # everything was cancelled while we waited
+
+            try:
+                rows = self.insert_rows([{**item.payload, "client_ref": item.temp_id} for item in batch])
+            except Exception as e:
+                self._requeue(batch, e)
+                continue
+
+            ledger = self.get_ledger()
+            with self._cond:
+                kept = [r for item, r in zip(batch, rows) if item.temp_id not in self._cancelled]
+                cancelled = [r.get("expense_id") for item, r in zip(batch, rows) if item.temp_id in self._cancelled]
+                self._cancelled -= {item.temp_id for item in batch}
+            if ledger is not None:
+                ledger.reconcile([item.temp_id for item in batch], kept)
+            if cancelled:
+                self._delete_cancelled(cancelled)
+
+            with self._cond:
+                self._in_flight = []
+                self.last_error = None
+                self._cond.notify_all()
+
+    def _requeue(self, batch, error):
+        with self._cond:
+            self._in_flight = []
+            self.last_error = f"{type(error).__name__}: {error}"
+            retry, failed = [], []
+            for item in batch:
+                if item.temp_id in self._cancelled:
+                    continue  # cancelled while in flight and never saved: nothing left to send
+                item.attempts += 1
+                (failed if item.attempts >= self.max_attempts else retry).append(item)
+            self._cancelled -= {item.temp_id for item in batch}
+            self._queue[:0] = retry
+            self._failed.extend(failed)
+            delay = min(self.backoff * 2 ** (max((i.attempts for i in batch), default=1) - 1), self.max_backoff)
+            self._cond.notify_all()
+
+        if failed:
+            ledger = self.get_ledger()
+            if ledger is not None:
+                ledger.remove([item.temp_id for item in failed])
+        time.sleep(delay)
+
+    def _delete_cancelled(self, expense_ids):
+        try:
+            self.delete_rows(expense_ids)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"